@@ -0,0 +1,126 @@
+"""Market-breadth and aggregate metrics for one index snapshot, in a single vectorised pass.
+
+`compute_aggregates` is the only place breadth, returns, dispersion, sector
+breadth and valuation ratios are computed; the pie chart, treemap, insights
+table and LLM prompt all read the resulting `MarketAggregates`.
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from metrics import timed
+
+SECTOR_COLUMNS = ['stocks', 'advances', 'declines', 'unchanged', 'cap', 'cap_weighted_return',
+                  'equal_weighted_return']
+
+
+@dataclass(frozen=True)
+class Valuation:
+    mean: float = np.nan
+    median: float = np.nan
+    cap_weighted: float = np.nan
+    coverage: int = 0  # stocks with a usable value
+
+
+@dataclass(frozen=True)
+class MarketAggregates:
+    stocks: int
+    advances: int
+    declines: int
+    unchanged: int
+    total_cap: float
+    equal_weighted_return: float
+    cap_weighted_return: float
+    dispersion: float  # sample standard deviation of pChange
+    sectors: pd.DataFrame  # one row per sector, SECTOR_COLUMNS, sorted by cap descending
+    top_gainers: pd.DataFrame
+    top_losers: pd.DataFrame
+    valuations: dict = field(default_factory=dict)  # { 'trailingPE' | 'priceToBook' | 'dividendYield' : Valuation }
+
+
+def _valuation(values, weights, harmonic):
+    """Mean, median and cap-weighted value over stocks with a positive ratio."""
+    mask = np.isfinite(values) & (values > 0)
+    if not mask.any():
+        return Valuation()
+    v, w = values[mask], weights[mask]
+    if w.sum() <= 0:
+        weighted = np.nan
+    elif harmonic:
+        # Price multiples aggregate as total cap over total earnings (book), i.e. a weighted harmonic mean
+        weighted = w.sum() / (w / v).sum()
+    else:
+        weighted = (v * w).sum() / w.sum()
+    return Valuation(float(v.mean()), float(np.median(v)), float(weighted), int(mask.sum()))
+
+
+@timed('transform.aggregates')
+def compute_aggregates(df, valuations=None, top_n=5):
+    """
+    Aggregates for an index frame with 'symbol', 'pChange', 'ffmc' and optionally 'sector'.
+
+    `valuations` is an optional frame indexed by yf_symbol with trailingPE,
+    priceToBook and dividendYield (a fraction) columns.
+    """
+    p = df['pChange'].to_numpy(dtype='float64', na_value=np.nan)
+    w = np.nan_to_num(df['ffmc'].to_numpy(dtype='float64', na_value=np.nan))
+    valid = np.isfinite(p)
+    p0 = np.where(valid, p, 0.0)
+    sign = np.sign(p0).astype(np.int64) + 1  # 0 decline, 1 unchanged, 2 advance
+    sign[~valid] = 1
+    declines, unchanged, advances = np.bincount(sign, minlength=3)
+
+    total_cap = float(w.sum())
+    valid_cap = float(w[valid].sum())
+    n_valid = int(valid.sum())
+
+    # Per-sector sums via one factorize + bincount per column, no boolean masks
+    if 'sector' in df.columns:
+        sector = df['sector'].astype(object).fillna('Unknown')
+    else:
+        sector = pd.Series('Unknown', index=df.index)
+    codes, names = pd.factorize(sector, sort=False)
+    k = len(names)
+    count = np.bincount(codes, minlength=k)
+    sectors = pd.DataFrame({
+        'stocks': count,
+        'advances': np.bincount(codes, weights=(sign == 2), minlength=k).astype(int),
+        'declines': np.bincount(codes, weights=(sign == 0), minlength=k).astype(int),
+        'unchanged': np.bincount(codes, weights=(sign == 1), minlength=k).astype(int),
+        'cap': np.bincount(codes, weights=w, minlength=k),
+    }, index=pd.Index(names, name='sector'))
+    cap_valid = np.bincount(codes, weights=np.where(valid, w, 0.0), minlength=k)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sectors['cap_weighted_return'] = np.bincount(codes, weights=p0 * w, minlength=k) / cap_valid
+        sectors['equal_weighted_return'] = (np.bincount(codes, weights=p0, minlength=k)
+                                            / np.bincount(codes, weights=valid, minlength=k))
+    sectors = sectors.sort_values('cap', ascending=False)
+
+    ratios = {}
+    if valuations is not None and 'yf_symbol' in df.columns and len(valuations):
+        joined = valuations.reindex(df['yf_symbol'])
+        for name, harmonic, scale in (('trailingPE', True, 1), ('priceToBook', True, 1), ('dividendYield', False, 100)):
+            if name in joined.columns:
+                values = pd.to_numeric(joined[name], errors='coerce').to_numpy(dtype='float64') * scale
+                ratios[name] = _valuation(values, w, harmonic)
+
+    return MarketAggregates(
+        stocks=len(df),
+        advances=int(advances),
+        declines=int(declines),
+        unchanged=int(unchanged),
+        total_cap=total_cap,
+        equal_weighted_return=float(p0.sum() / n_valid) if n_valid else np.nan,
+        cap_weighted_return=float((p0 * w).sum() / valid_cap) if valid_cap else np.nan,
+        dispersion=float(p[valid].std(ddof=1)) if n_valid > 1 else np.nan,
+        sectors=sectors,
+        top_gainers=df.nlargest(top_n, 'pChange')[['symbol', 'pChange']],
+        top_losers=df.nsmallest(top_n, 'pChange')[['symbol', 'pChange']],
+        valuations=ratios,
+    )
+
+
+def valuation_frame(fundamentals):
+    """Frame indexed by yf_symbol from a FundamentalsResult, ready for `compute_aggregates`."""
+    return pd.DataFrame.from_dict(fundamentals.data, orient='index')
@@ -0,0 +1,244 @@
+"""Headless HTTP API over the poller's snapshots, for tools that want the dashboard's data without the page.
+
+    GET /indices                      -> ["NIFTY TOTAL MARKET", ...]
+    GET /snapshot/<index>             -> enriched constituent frame (JSON, or Arrow IPC stream when
+                                         ?format=arrow or Accept: application/vnd.apache.arrow.stream)
+    GET /snapshot/<index>/insights    -> breadth, returns, sectors, valuations and top movers (JSON)
+    GET /metrics, /metrics.json       -> stage latencies, cache hit/miss counters and client stats
+
+Responses carry an ETag derived from the snapshot's fetch time, so a client
+sending If-None-Match gets an empty 304 until the next poll. Encoded bodies are
+cached per snapshot, so any number of clients cost one serialisation per poll;
+insights built while Yahoo's circuit is open are sent uncached and without an
+ETag, so they are rebuilt once fundamentals come back.
+The API reads the same process-wide poller and stores as the dashboard: run it
+standalone with `python -m api`, or set API_PORT to serve it from the
+Streamlit process itself.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import math
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+import config
+from aggregates import compute_aggregates, valuation_frame
+from circuit import get_breaker
+from fundamentals import VALUATION_FIELDS
+from market_data import INDEX_LIST
+from metrics import cache_hit, cache_miss, registry
+from poller import get_poller
+from store import get_fundamentals
+
+log = logging.getLogger(__name__)
+
+ARROW_STREAM = 'application/vnd.apache.arrow.stream'
+
+
+def _number(value):
+    """JSON-safe float: NaN and infinities become null."""
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+def _records(frame):
+    return json.loads(frame.to_json(orient='records'))  # NaN -> null, numpy scalars -> plain JSON
+
+
+def snapshot_json(snapshot):
+    body = {'index': snapshot.index_name, 'fetched_at': snapshot.fetched_at.isoformat(),
+            'rows': _records(snapshot.frame)}
+    return json.dumps(body).encode()
+
+
+def snapshot_arrow(snapshot):
+    """Arrow IPC stream of the frame; the index name and fetch time travel as schema metadata."""
+    import pyarrow as pa
+    table = pa.Table.from_pandas(snapshot.frame, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                           b'index': snapshot.index_name.encode(),
+                                           b'fetched_at': snapshot.fetched_at.isoformat().encode()})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def insights_json(snapshot):
+    """The aggregates behind the dashboard's pie, insights table and AI summary."""
+    df = snapshot.frame
+    fundamentals = get_fundamentals(df['yf_symbol'].tolist(), VALUATION_FIELDS)
+    agg = compute_aggregates(df, valuation_frame(fundamentals))
+    body = {
+        'index': snapshot.index_name,
+        'fetched_at': snapshot.fetched_at.isoformat(),
+        'stocks': agg.stocks,
+        'advances': agg.advances,
+        'declines': agg.declines,
+        'unchanged': agg.unchanged,
+        'total_cap': _number(agg.total_cap),
+        'equal_weighted_return': _number(agg.equal_weighted_return),
+        'cap_weighted_return': _number(agg.cap_weighted_return),
+        'dispersion': _number(agg.dispersion),
+        'valuations': {name: {'mean': _number(v.mean), 'median': _number(v.median),
+                              'cap_weighted': _number(v.cap_weighted), 'coverage': v.coverage}
+                       for name, v in agg.valuations.items()},
+        'fundamentals_coverage': [len(fundamentals.data), fundamentals.requested],
+        'sectors': _records(agg.sectors.reset_index()),
+        'top_gainers': _records(agg.top_gainers),
+        'top_losers': _records(agg.top_losers),
+    }
+    return json.dumps(body).encode()
+
+
+RENDERERS = {
+    # representation : (content type, encoder)
+    'json': ('application/json', snapshot_json),
+    'arrow': (ARROW_STREAM, snapshot_arrow),
+    'insights': ('application/json', insights_json),
+}
+
+
+class BodyCache:
+    """Encoded responses keyed by (index, fetch time, representation); one encode per snapshot."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, build, keep=None):
+        """Cached body for `key`, built on a miss; with `keep`, a body is only cached while `keep()` is true."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                cache_hit('api_bodies')
+                return self._entries[key]
+        cache_miss('api_bodies')
+        body = build()
+        if keep is not None and not keep():
+            return body
+        with self._lock:
+            self._entries[key] = body
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return body
+
+
+body_cache = BodyCache()
+
+
+def etag(snapshot, representation):
+    digest = hashlib.sha1(f"{snapshot.index_name}|{snapshot.fetched_at.isoformat()}|{representation}".encode())
+    return f'"{digest.hexdigest()[:20]}"'
+
+
+class SnapshotHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    poller = None  # set by make_server; defaults to the process-wide poller
+
+    def log_message(self, fmt, *args):
+        log.debug("%s - %s", self.address_string(), fmt % args)
+
+    def _send(self, status, body=b'', content_type='application/json', headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body and self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _error(self, status, message):
+        self._send(status, json.dumps({'error': message}).encode())
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = [unquote(p) for p in url.path.strip('/').split('/') if p]
+        if parts == ['indices']:
+            return self._send(200, json.dumps(INDEX_LIST).encode())
+        if parts == ['metrics']:
+            return self._send(200, registry.prometheus().encode(), 'text/plain; version=0.0.4; charset=utf-8')
+        if parts == ['metrics.json']:
+            return self._send(200, json.dumps(registry.snapshot()).encode())
+        if not parts or parts[0] != 'snapshot' or len(parts) not in (2, 3) \
+                or (len(parts) == 3 and parts[2] != 'insights'):
+            return self._error(404, "unknown path; try /indices or /snapshot/<index>")
+
+        index_name = parts[1].upper()
+        if index_name not in INDEX_LIST:
+            return self._error(404, f"unknown index {parts[1]!r}")
+        if len(parts) == 3:
+            representation = 'insights'
+        else:
+            fmt = parse_qs(url.query).get('format', [''])[0].lower()
+            wants_arrow = fmt == 'arrow' or (not fmt and ARROW_STREAM in self.headers.get('Accept', ''))
+            representation = 'arrow' if wants_arrow else 'json'
+
+        snapshot = (self.poller or get_poller()).get(index_name)
+        if snapshot is None:
+            return self._error(503, f"no data for {index_name} yet")
+
+        # Insights depend on Yahoo as well as the snapshot: never cache them as data while its circuit is open
+        keep = (lambda: get_breaker('yahoo').closed) if representation == 'insights' else None
+        tag = etag(snapshot, representation)
+        headers = {'ETag': tag, 'Cache-Control': f'max-age={int(config.POLL_INTERVAL)}', 'Vary': 'Accept'}
+        if (keep is None or keep()) and tag in [t.strip() for t in self.headers.get('If-None-Match', '').split(',')]:
+            return self._send(304, headers=headers)
+
+        content_type, encode = RENDERERS[representation]
+        try:
+            body = body_cache.get_or_build((index_name, snapshot.fetched_at, representation),
+                                           lambda: encode(snapshot), keep)
+        except Exception as e:
+            log.exception("Encoding %s as %s failed", index_name, representation)
+            return self._error(500, str(e))
+        if keep is not None and not keep():  # built from partial fundamentals: not to be revalidated with a 304
+            headers = {'Cache-Control': 'no-store', 'Vary': 'Accept'}
+        self._send(200, body, content_type, headers)
+
+    do_HEAD = do_GET
+
+
+def make_server(host=None, port=None, poller=None):
+    """A ThreadingHTTPServer serving the API; `poller` defaults to the process-wide one."""
+    handler = type('Handler', (SnapshotHandler,), {'poller': poller})
+    return ThreadingHTTPServer((host or config.API_HOST, config.API_PORT if port is None else port), handler)
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def serve_in_background(host=None, port=None):
+    """Start the API once per process on a daemon thread (used by the dashboard when API_PORT is set)."""
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = make_server(host, port)
+            threading.Thread(target=_server.serve_forever, name='snapshot-api', daemon=True).start()
+        return _server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve index snapshots over HTTP as JSON and Arrow.")
+    parser.add_argument('--host', default=config.API_HOST)
+    parser.add_argument('--port', type=int, default=config.API_PORT or 8502)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    server = make_server(args.host, args.port)
+    log.info("Serving snapshots on http://%s:%d", *server.server_address[:2])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Micro-benchmark of `compute_aggregates` on a synthetic frame, against the
+mask-per-metric pandas code it replaced.
+
+    python -m benchmarks.bench_aggregates --rows 5000
+"""
+import argparse
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from aggregates import compute_aggregates
+
+SECTORS = ['Financial Services', 'Technology', 'Industrials', 'Consumer Cyclical', 'Healthcare',
+           'Basic Materials', 'Energy', 'Consumer Defensive', 'Utilities', 'Real Estate', 'Unknown']
+
+
+def synthetic_frame(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    pchange = np.round(rng.normal(0, 2, rows), 2)
+    pchange[rng.random(rows) < 0.02] = 0.0
+    return pd.DataFrame({
+        'symbol': [f"SYM{i:05d}" for i in range(rows)],
+        'yf_symbol': [f"SYM{i:05d}.NS" for i in range(rows)],
+        'pChange': pchange,
+        'ffmc': np.round(rng.lognormal(9, 1.5, rows)),
+        'sector': rng.choice(SECTORS, rows),
+    })
+
+
+def legacy_aggregates(df):
+    """The previous approach: one boolean mask per metric and per sector."""
+    out = {
+        'advances': df[df['pChange'] > 0].shape[0],
+        'declines': df[df['pChange'] < 0].shape[0],
+        'unchanged': df[df['pChange'] == 0].shape[0],
+        'std': df['pChange'].std(),
+        'cap_weighted': (df['pChange'] * df['ffmc']).sum() / df['ffmc'].sum(),
+    }
+    for sector in df['sector'].unique():
+        part = df[df['sector'] == sector]
+        out[sector] = (part[part['pChange'] > 0].shape[0], part[part['pChange'] < 0].shape[0],
+                       (part['pChange'] * part['ffmc']).sum() / part['ffmc'].sum())
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    df = synthetic_frame(args.rows)
+    agg, legacy = compute_aggregates(df), legacy_aggregates(df)
+    assert (agg.advances, agg.declines, agg.unchanged) == (legacy['advances'], legacy['declines'], legacy['unchanged'])
+    assert np.isclose(agg.cap_weighted_return, legacy['cap_weighted']) and np.isclose(agg.dispersion, legacy['std'])
+    for sector, (adv, dec, cwr) in ((s, legacy[s]) for s in df['sector'].unique()):
+        row = agg.sectors.loc[sector]
+        assert (row['advances'], row['declines']) == (adv, dec) and np.isclose(row['cap_weighted_return'], cwr)
+
+    print(f"{args.rows} rows, {df['sector'].nunique()} sectors, best of 5 x {args.repeat} runs")
+    for name, fn in (('compute_aggregates', compute_aggregates), ('legacy masks', legacy_aggregates)):
+        best = min(timeit.repeat(lambda: fn(df), number=args.repeat, repeat=5)) / args.repeat
+        print(f"{name:<20} {best * 1e3:8.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+"""
+Wall-clock time of `fetch_fundamentals` against a local Yahoo stub, per worker count.
+
+    python -m benchmarks.bench_fundamentals --symbols 750 --latency 0.05
+"""
+import argparse
+
+from benchmarks.stubs import YahooStub
+from fundamentals import VALUATION_FIELDS, YahooClient, fetch_fundamentals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', type=int, default=750, help="number of symbols to fetch")
+    parser.add_argument('--latency', type=float, default=0.05, help="stub latency per request, seconds")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8, 16, 32, 64])
+    args = parser.parse_args()
+
+    symbols = [f"SYM{i:04d}.NS" for i in range(args.symbols)]
+    with YahooStub(latency=args.latency) as stub:
+        print(f"{args.symbols} symbols, {args.latency * 1000:.0f} ms stub latency")
+        print(f"{'workers':>8} {'seconds':>9} {'symbols/s':>10} {'speedup':>8} {'failed':>7}")
+        baseline = None
+        for workers in args.workers:
+            client = YahooClient(base_url=stub.url, cookie_url=stub.url, pool_size=workers)
+            result = fetch_fundamentals(symbols, fields=VALUATION_FIELDS, max_workers=workers, client=client)
+            baseline = baseline or result.elapsed
+            print(f"{workers:>8} {result.elapsed:>9.2f} {len(symbols) / result.elapsed:>10.1f} "
+                  f"{baseline / result.elapsed:>7.1f}x {len(result.errors):>7}")
+
+
+if __name__ == '__main__':
+    main()
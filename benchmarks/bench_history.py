@@ -0,0 +1,77 @@
+"""
+Intraday history: a synthetic trading day of universe polls appended as
+deltas, then the size on disk, the time to load the day after a restart and
+the time to rebuild one point in time.
+
+    python -m benchmarks.bench_history --symbols 750 --polls 75 --changing 0.6
+"""
+import argparse
+import datetime
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.stubs import SECTORS
+from history import HistoryStore
+
+
+def polls(symbols, count, changing, seed=0):
+    """`count` universe frames, one poll apart; each poll moves a `changing` fraction of the symbols."""
+    rng = np.random.default_rng(seed)
+    n = len(symbols)
+    price = 100 + rng.random(n) * 2000
+    frame = pd.DataFrame({'symbol': symbols, 'sector': [SECTORS[i % len(SECTORS)] for i in range(n)],
+                          'change': 0.0, 'pChange': 0.0, 'ffmc': np.round(rng.random(n) * 1e5),
+                          'totalTradedVolume': 0.0})
+    open_price = price.copy()
+    for _ in range(count):
+        moved = rng.random(n) < changing
+        price = np.where(moved, np.round(price * (1 + rng.normal(0, 0.002, n)), 2), price)
+        frame = frame.assign(lastPrice=price, change=price - open_price, pChange=(price / open_price - 1) * 100,
+                             totalTradedVolume=frame['totalTradedVolume'] + moved * rng.integers(0, 5000, n))
+        yield frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', type=int, default=750)
+    parser.add_argument('--polls', type=int, default=75, help="polls in the day (75 = every 5 minutes)")
+    parser.add_argument('--changing', type=float, default=0.6, help="fraction of symbols whose quote moves per poll")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp()
+    store = HistoryStore(root)
+    symbols = [f"S{i:04d}" for i in range(args.symbols)]
+    opened = datetime.datetime(2025, 10, 17, 9, 15)
+    times, rows, appends = [], 0, []
+    for i, frame in enumerate(polls(symbols, args.polls, args.changing)):
+        fetched_at = opened + datetime.timedelta(minutes=5 * i)
+        start = time.perf_counter()
+        rows += store.append(frame, fetched_at)
+        appends.append(time.perf_counter() - start)
+        times.append(fetched_at)
+
+    directory = os.path.join(root, opened.date().isoformat())
+    size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+    start = time.perf_counter()
+    history = HistoryStore(root).load(opened.date())  # as after a restart: nothing in memory
+    load = time.perf_counter() - start
+    picks = times[::max(1, len(times) // 10)]
+    start = time.perf_counter()
+    for at in picks:
+        history.frame_at(at)
+    rebuild = (time.perf_counter() - start) / len(picks)
+
+    print(f"{args.polls} polls x {args.symbols} symbols, {100 * args.changing:.0f}% changing per poll")
+    print(f"rows written    {rows:>10,} of {args.polls * args.symbols:,} ({rows / (args.polls * args.symbols):.0%})")
+    print(f"on disk         {size / 1e6:>10.2f} MB in {len(os.listdir(directory))} parts")
+    print(f"append          {1e3 * np.median(appends):>10.1f} ms per poll (median)")
+    print(f"load the day    {load:>10.2f} s")
+    print(f"frame_at        {1e3 * rebuild:>10.1f} ms per point in time")
+
+
+if __name__ == '__main__':
+    main()
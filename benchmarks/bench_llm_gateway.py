@@ -0,0 +1,44 @@
+"""
+Drive the LLM gateway with many concurrent callers against a local Groq stand-in.
+
+    python -m benchmarks.bench_llm_gateway --callers 60 --prompts 6 --concurrency 4 --rate-limited 3
+
+Identical prompts in flight are sent upstream once, at most `--concurrency`
+completions run at a time, and 429s are retried after the stub's Retry-After.
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.stubs import GroqStub
+from llm_gateway import LLMGateway
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--callers', type=int, default=60, help="concurrent sessions asking for a summary")
+    parser.add_argument('--prompts', type=int, default=6, help="distinct prompts among them")
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.3, help="stub latency per completion, seconds")
+    parser.add_argument('--rate-limited', type=int, default=3, help="first N upstream requests get a 429")
+    args = parser.parse_args()
+
+    with GroqStub(latency=args.latency, rate_limit_first=args.rate_limited, retry_after=0.2) as stub:
+        gateway = LLMGateway(api_key='stub', base_url=stub.url, max_concurrency=args.concurrency)
+        prompts = [f"Summarise index {i % args.prompts}" for i in range(args.callers)]
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.callers) as pool:
+            replies = list(pool.map(gateway.complete, prompts))
+        elapsed = time.perf_counter() - start
+
+        print(f"{args.callers} callers, {args.prompts} distinct prompts, concurrency {args.concurrency}")
+        print(f"wall clock        {elapsed:.2f} s")
+        print(f"upstream requests {stub.requests} (of which {args.rate_limited} rate-limited)")
+        print(f"complete replies  {sum(r == stub.reply for r in replies)}/{len(replies)}")
+        for key, value in gateway.metrics().items():
+            print(f"{key:<17} {value}")
+
+
+if __name__ == '__main__':
+    main()
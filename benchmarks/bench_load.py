@@ -0,0 +1,180 @@
+"""
+Load test: N concurrent dashboard sessions against fixture (or synthetic)
+NSE / Yahoo / Groq responses served by local stand-ins, with configurable
+latency, jitter and injected upstream errors. The committed fixture
+(benchmarks/data/fixture.json.gz) is replayed by default; --synthetic N
+scales the market to N stocks instead.
+
+Sessions share one process, as they do behind a Streamlit server, so they
+share the poller, stores and caches. Each session opens the page (total
+market), switches to its mode and then reruns with a different Slice By each
+time. Sessions are spread over the modes:
+
+    total   NIFTY TOTAL MARKET
+    single  NIFTY 50
+    multi   Multi Index Comparison (NIFTY 50 and NIFTY BANK)
+
+Reported per mode: p50/p99 of the first page load and of the reruns, plus the
+requests each upstream received and the cache hit ratios.
+
+    python -m benchmarks.bench_load --sessions 20 --reruns 5 --latency 0.1 --error-rate 0.02
+    python -m benchmarks.bench_load --synthetic 750 --sessions 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from benchmarks import fixtures as fx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ['total', 'single', 'multi']
+SLICES = ['Gainers', 'Losers', 'Market Cap']
+
+
+def prepare_concurrent_sessions():
+    """
+    Make AppTest safe to run from several threads at once.
+
+    AppTest installs a mock Runtime per script run and clears it when the run
+    ends, which breaks runs still going in other sessions, so the first one is
+    pinned for the rest of the process; that also gives every session the same
+    st.cache_data storage, as on a server. Compiling the script is serialised
+    because concurrent ast.parse calls can fail on CPython 3.11.
+    """
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    pinned = []
+    compile_lock = threading.Lock()
+    get_bytecode = ScriptCache.get_bytecode
+
+    def locked_get_bytecode(self, script_path):
+        with compile_lock:
+            return get_bytecode(self, script_path)
+
+    def instance(cls):
+        if not pinned and cls._instance is not None:
+            pinned.append(cls._instance)
+        if not pinned:
+            raise RuntimeError("Runtime hasn't been created!")
+        return pinned[0]
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(lambda cls: bool(pinned) or cls._instance is not None)
+    ScriptCache.get_bytecode = locked_get_bytecode
+
+
+def _widget(elements, label):
+    return next(e for e in elements if e.label == label)
+
+
+def run_session(mode, reruns, timeout, start_gate, results):
+    """One session: open the page, switch to `mode`, then rerun with a new Slice By each time."""
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(os.path.join(ROOT, 'main.py'), default_timeout=timeout)
+    timings, failures = [], []
+    start_gate.wait()
+
+    def timed(action):
+        start = time.perf_counter()
+        try:
+            action()
+        except Exception as e:
+            failures.append(f"{type(e).__name__}: {e}")
+            return
+        timings.append(time.perf_counter() - start)
+        failures.extend(e.message for e in at.exception)
+
+    timed(at.run)
+    first = timings[:1]
+    if mode == 'single':
+        timed(lambda: _widget(at.selectbox, "Choose Index").set_value("NIFTY 50").run())
+    elif mode == 'multi':
+        timed(lambda: _widget(at.radio, "View Mode").set_value("Multi Index Comparison").run())
+    for i in range(reruns):
+        timed(lambda: _widget(at.selectbox, "Slice By").set_value(SLICES[i % len(SLICES)]).run())
+    results.append({'mode': mode, 'first': first, 'reruns': timings[1:], 'failures': failures})
+
+
+def percentiles(values):
+    if not values:
+        return float('nan'), float('nan')
+    return np.percentile(values, 50), np.percentile(values, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=12)
+    parser.add_argument('--reruns', type=int, default=4)
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    parser.add_argument('--fixture', default=fx.DEFAULT_FIXTURE,
+                        help="fixture file recorded with `python -m benchmarks.fixtures --record`")
+    parser.add_argument('--synthetic', type=int, metavar='SYMBOLS',
+                        help="replay a synthetic market of this many stocks instead of the fixture")
+    parser.add_argument('--latency', type=float, default=0.1, help="seconds added to every upstream response")
+    parser.add_argument('--jitter', type=float, default=0.05, help="up to this many extra seconds per response")
+    parser.add_argument('--llm-latency', type=float, help="latency of the Groq stub (defaults to --latency)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of upstream requests answered 503")
+    parser.add_argument('--timeout', type=float, default=180, help="seconds allowed per script run")
+    args = parser.parse_args()
+
+    fixtures = fx.synthetic(args.synthetic) if args.synthetic else fx.load(args.fixture)
+    sys.path.insert(0, ROOT)
+    os.chdir(tempfile.mkdtemp())
+    # A secrets file rather than AppTest.secrets, which swaps the process-wide secrets on every run
+    os.makedirs('.streamlit')
+    with open(os.path.join('.streamlit', 'secrets.toml'), 'w') as f:
+        f.write('GROQ_API_KEY = "stub"\n')
+    with fx.serve(fixtures, args.latency, args.jitter, args.error_rate, args.llm_latency) as stubs:
+        from metrics import registry  # imported after serve() so config picks up the stub URLs
+        prepare_concurrent_sessions()
+
+        start_gate = threading.Barrier(args.sessions)
+        results = []
+        threads = [threading.Thread(target=run_session, name=f"session-{i}", daemon=True,
+                                    args=(args.modes[i % len(args.modes)], args.reruns, args.timeout,
+                                          start_gate, results))
+                   for i in range(args.sessions)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - start
+
+        print(f"{args.sessions} sessions x {args.reruns} reruns in {wall:.1f} s; upstream latency {args.latency:.2f} s "
+              f"+ up to {args.jitter:.2f} s, {100 * args.error_rate:.0f}% injected errors")
+        recorded = f" at {fixtures['recorded_at']}" if fixtures.get('recorded_at') else ''
+        print(f"fixture: {len(fixtures['nse'][fx.TOTAL_MARKET]['data']) - 1} stocks, "
+              f"{fixtures.get('source', 'recorded')}{recorded}")
+        print(f"{'mode':<8} {'sessions':>8} {'first p50':>10} {'first p99':>10} {'rerun p50':>10} {'rerun p99':>10} "
+              f"{'failures':>9}")
+        for mode in args.modes:
+            done = [r for r in results if r['mode'] == mode]
+            first = percentiles([t for r in done for t in r['first']])
+            rerun = percentiles([t for r in done for t in r['reruns']])
+            print(f"{mode:<8} {len(done):>8} {first[0]:>9.2f}s {first[1]:>9.2f}s {rerun[0]:>9.2f}s {rerun[1]:>9.2f}s "
+                  f"{sum(len(r['failures']) for r in done):>9}")
+        if len(results) < args.sessions:
+            print(f"warning: {args.sessions - len(results)} sessions did not finish")
+        for failure in sorted({f for r in results for f in r['failures']})[:5]:
+            print(f"failure: {failure[:200]}")
+
+        for name, stub in stubs.items():
+            extra = f", {stub.warmups} cookie warm-ups" if name == 'nse' else ''
+            print(f"{name:<6} {stub.requests:>6} requests ({stub.errors} injected errors{extra})")
+        caches = registry.snapshot()['caches']
+        if caches:
+            print("cache hit ratios: " + ", ".join(f"{name} {c['hit_ratio']:.0%} of {c['hits'] + c['misses']}"
+                                                   for name, c in caches.items()))
+        slowest = sorted(registry.snapshot()['stages'].items(), key=lambda kv: -kv[1]['total_ms'])[:5]
+        print("busiest stages: " + ", ".join(f"{stage} {s['total_ms'] / 1e3:.1f} s over {s['count']}"
+                                             for stage, s in slowest))
+
+
+if __name__ == '__main__':
+    main()
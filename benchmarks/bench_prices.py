@@ -0,0 +1,108 @@
+"""
+Historical price loader: a cold bulk load, a warm reload from the local cache
+and an incremental top-up of newer sessions, all served offline by a fixture
+downloader with a simulated per-call latency.
+
+    python -m benchmarks.bench_prices --symbols 750 --days 400 --latency 2.0
+
+`--fixture PATH` replays bars recorded earlier with `--record PATH` (which is
+the only mode that talks to Yahoo Finance) instead of synthetic ones.
+"""
+import argparse
+import datetime
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from prices import BAR_COLUMNS, PriceStore, get_returns, history_start, yf_download
+
+
+def synthetic_bars(symbols, start, end, seed=0):
+    """Deterministic random-walk daily bars for `symbols` on weekdays in [start, end]."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(start, end)
+    frames = []
+    for symbol in symbols:
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, len(dates))))
+        frames.append(pd.DataFrame({
+            'date': dates, 'symbol': symbol,
+            'open': close * (1 + rng.normal(0, 0.003, len(dates))),
+            'high': close * 1.01, 'low': close * 0.99, 'close': close, 'adj_close': close,
+            'volume': rng.integers(1e4, 1e6, len(dates)).astype('float64'),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+class FixtureDownloader:
+    """`download(symbols, start, end)` served from a bars frame, counting calls and rows handed out."""
+
+    def __init__(self, bars, latency=0.0):
+        self.bars = bars
+        self.latency = latency
+        self.calls = 0
+        self.rows = 0
+
+    @classmethod
+    def from_file(cls, path, latency=0.0):
+        return cls(pd.read_parquet(path), latency)
+
+    def __call__(self, symbols, start, end):
+        time.sleep(self.latency)
+        self.calls += 1
+        bars = self.bars[self.bars['symbol'].isin(symbols) & (self.bars['date'] >= pd.Timestamp(start))
+                         & (self.bars['date'] <= pd.Timestamp(end))]
+        self.rows += len(bars)
+        return bars[['date', 'symbol', *BAR_COLUMNS]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', type=int, default=750)
+    parser.add_argument('--days', type=int, default=400, help="calendar days of history in the fixture")
+    parser.add_argument('--latency', type=float, default=2.0, help="seconds per simulated bulk download")
+    parser.add_argument('--fixture', help="Parquet file of recorded bars to replay")
+    parser.add_argument('--record', help="download real bars for a handful of large caps and save them here")
+    args = parser.parse_args()
+
+    end = datetime.date.today() - datetime.timedelta(days=1)
+    if args.record:
+        symbols = [f"{s}.NS" for s in ('RELIANCE', 'TCS', 'HDFCBANK', 'INFY', 'ICICIBANK')]
+        yf_download(symbols, history_start(end), end).to_parquet(args.record)
+        print(f"recorded {args.record}")
+        return
+
+    if args.fixture:
+        downloader = FixtureDownloader.from_file(args.fixture, args.latency)
+        symbols = sorted(downloader.bars['symbol'].unique())
+    else:
+        symbols = [f"SYM{i:04d}.NS" for i in range(args.symbols)]
+        downloader = FixtureDownloader(
+            synthetic_bars(symbols, end - datetime.timedelta(days=args.days), end), args.latency)
+
+    workdir = tempfile.mkdtemp()
+    make_store = lambda: PriceStore(os.path.join(workdir, 'prices'), os.path.join(workdir, 'm.db'), downloader)
+    older = end - datetime.timedelta(days=5)
+
+    def run(name, store, until):
+        calls, rows = downloader.calls, downloader.rows
+        start = time.perf_counter()
+        returns = get_returns(symbols, end=until, store=store)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<28} {elapsed * 1e3:>9.1f} ms  {downloader.calls - calls:>4} downloads "
+              f"{downloader.rows - rows:>9,} rows  {int(returns['YTD'].notna().sum()):>5} returns")
+
+    print(f"{len(symbols)} symbols, {args.latency:.1f} s per bulk download")
+    run('cold load', make_store(), older)
+    store = make_store()
+    run('warm, after restart', store, older)
+    run('incremental (+5 days)', store, end)
+    run('cached', store, end)
+    per_symbol = args.latency * len(symbols)
+    print(f"one request per symbol would take ~{per_symbol:,.0f} s at the same latency")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Memory of the NIFTY TOTAL MARKET snapshot: the full NSE frame with generic
+dtypes against the compact SNAPSHOT_COLUMNS schema.
+
+"shared" is the snapshot every session reads (held once per process);
+"per session" is what each session's rerun allocates on top of it for the
+default view (Market Cap, unsorted) and a sorted view, measured while N
+sessions hold their frames; "pickled" is what an st.cache_data hit copies
+for one frame.
+
+    python -m benchmarks.bench_snapshot_memory --symbols 750 --sessions 20
+"""
+import argparse
+import pickle
+import tracemalloc
+
+import pandas as pd
+import pyarrow as pa
+
+from benchmarks.stubs import SECTORS, equity_stock_indices_payload
+from market_data import compact_frame, parse_index_payload
+from views import SnapshotView
+
+
+def universe_frame(n):
+    """The decorated universe frame as the poller used to keep it: every NSE field plus a sector column."""
+    frame = parse_index_payload(equity_stock_indices_payload('NIFTY TOTAL MARKET', [f"S{i:04d}" for i in range(n)]))
+    return frame.assign(sector=[SECTORS[i % len(SECTORS)] for i in range(n)])
+
+
+def held_per_session(select, sessions):
+    """
+    Bytes allocated per session while `sessions` callers each hold the frame `select()` returns.
+
+    Counts Python allocations (tracemalloc) plus Arrow's, which back pandas' string columns.
+    """
+    tracemalloc.start()
+    before, arrow_before = tracemalloc.take_snapshot(), pa.total_allocated_bytes()
+    held = [select() for _ in range(sessions)]
+    after, arrow_after = tracemalloc.take_snapshot(), pa.total_allocated_bytes()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, 'filename')) + arrow_after - arrow_before
+    del held
+    return allocated / sessions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', type=int, default=750)
+    parser.add_argument('--sessions', type=int, default=20)
+    args = parser.parse_args()
+
+    raw = universe_frame(args.symbols)
+    variants = {
+        # name : (view, select(view, sort_by) -> frame)
+        'generic dtypes (before)': (SnapshotView(raw), lambda view, sort_by: view.frame.take(view.orders[sort_by])),
+        'compact schema': (SnapshotView(compact_frame(raw)),
+                           lambda view, sort_by: view.select('Market Cap', sort_by)[0]),
+    }
+    print(f"NIFTY TOTAL MARKET, {args.symbols} stocks, {args.sessions} sessions")
+    print(f"{'':<24} {'columns':>7} {'shared':>10} {'per session':>12} {'sorted view':>12} {'pickled':>10}")
+    for name, (view, select) in variants.items():
+        shared = view.frame.memory_usage(deep=True).sum()
+        default = held_per_session(lambda: select(view, None), args.sessions)
+        by_cap = held_per_session(lambda: select(view, 'ffmc (High to Low)'), args.sessions)
+        pickled = len(pickle.dumps(select(view, None)))
+        print(f"{name:<24} {len(view.frame.columns):>7} {shared / 1024:>7.0f} KB {default / 1024:>9.1f} KB "
+              f"{by_cap / 1024:>9.1f} KB {pickled / 1024:>7.0f} KB")
+    print(f"dtypes: {dict(pd.Series(variants['compact schema'][0].frame.dtypes.astype(str)).value_counts())}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Cold-start cost of the dashboard: module import time, which heavy clients get
+loaded at import, and time to first paint of a fresh session against local
+NSE / Yahoo / Groq stand-ins.
+
+Each measurement runs in a new interpreter so nothing is warm. "First paint" is
+when the script sends its first element (the page skeleton); "first chart" when
+the first treemap is sent; "done" when the script run ends, AI summary included.
+
+    python -m benchmarks.bench_startup --runs 3 --latency 0.2
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_MODULES = ['aggregates', 'api', 'charts', 'config', 'fundamentals', 'insights', 'market_data', 'poller',
+               'prices', 'store', 'styles', 'treemap']
+HEAVY_MODULES = ['groq', 'yfinance', 'plotly.express', 'matplotlib']
+
+
+def measure_imports():
+    start = time.perf_counter()
+    import streamlit  # noqa: F401
+    streamlit_done = time.perf_counter()
+    for name in APP_MODULES:
+        __import__(name)
+    done = time.perf_counter()
+    return {'streamlit_ms': 1e3 * (streamlit_done - start), 'app_modules_ms': 1e3 * (done - streamlit_done),
+            'heavy_loaded': [m for m in HEAVY_MODULES if m in sys.modules]}
+
+
+def measure_first_paint(latency):
+    from benchmarks.stubs import GroqStub, NSEStub, YahooStub
+    symbols = [f"S{i:03d}" for i in range(750)]
+    nse = NSEStub({'NIFTY TOTAL MARKET': symbols, 'NIFTY 50': symbols[:50]}, latency=latency).__enter__()
+    yahoo = YahooStub(latency=latency).__enter__()
+    groq_stub = GroqStub(latency=latency).__enter__()
+    workdir = tempfile.mkdtemp()
+    os.environ.update(NSE_BASE_URL=nse.url, YAHOO_BASE_URL=yahoo.url, YAHOO_COOKIE_URL=yahoo.url,
+                      GROQ_BASE_URL=groq_stub.url, STORE_PATH=os.path.join(workdir, 'market.db'),
+                      HISTORY_DIR=os.path.join(workdir, 'history'), PRICES_DIR=os.path.join(workdir, 'prices'))
+
+    from streamlit.delta_generator import DeltaGenerator
+    from streamlit.testing.v1 import AppTest
+
+    start = time.perf_counter()
+    sent = {}  # { element type : seconds since start, first occurrence }
+    enqueue = DeltaGenerator._enqueue
+
+    def timed_enqueue(self, delta_type, *args, **kwargs):
+        sent.setdefault(delta_type, time.perf_counter() - start)
+        sent.setdefault('first', time.perf_counter() - start)
+        return enqueue(self, delta_type, *args, **kwargs)
+
+    DeltaGenerator._enqueue = timed_enqueue
+    at = AppTest.from_file(os.path.join(ROOT, 'main.py'), default_timeout=120)
+    at.secrets['GROQ_API_KEY'] = 'stub'
+    at.run()
+    done = time.perf_counter() - start
+    return {'first_paint_ms': 1e3 * sent.get('first', done), 'first_chart_ms': 1e3 * sent.get('plotly_chart', done),
+            'done_ms': 1e3 * done, 'exceptions': len(at.exception)}
+
+
+def child(args):
+    sys.path.insert(0, ROOT)
+    os.chdir(tempfile.mkdtemp())
+    result = measure_imports() if args.child == 'imports' else measure_first_paint(args.latency)
+    print(json.dumps(result))
+
+
+def run_child(kind, latency):
+    out = subprocess.run([sys.executable, '-m', 'benchmarks.bench_startup', '--child', kind, '--latency', str(latency)],
+                         cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.2, help="seconds added to every stub response")
+    parser.add_argument('--child', choices=['imports', 'paint'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args)
+
+    imports = [run_child('imports', args.latency) for _ in range(args.runs)]
+    print(f"import streamlit          {statistics.median(r['streamlit_ms'] for r in imports):>8.0f} ms")
+    print(f"import app modules        {statistics.median(r['app_modules_ms'] for r in imports):>8.0f} ms")
+    print(f"heavy clients at import   {', '.join(imports[0]['heavy_loaded']) or 'none'}")
+
+    paints = [run_child('paint', args.latency) for _ in range(args.runs)]
+    for key, label in (('first_paint_ms', 'first paint'), ('first_chart_ms', 'first chart'), ('done_ms', 'script done')):
+        print(f"{label:<25} {statistics.median(r[key] for r in paints):>8.0f} ms")
+    if any(r['exceptions'] for r in paints):
+        print("warning: the app raised during a run")
+
+
+if __name__ == '__main__':
+    main()
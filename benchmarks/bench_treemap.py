@@ -0,0 +1,69 @@
+"""
+Build time and serialised payload size of the treemap for growing leaf counts:
+the previous `px.treemap` path against the array-based `go.Treemap` path and
+the sector-only rollup.
+
+    python -m benchmarks.bench_treemap --leaves 50 500 750 --max-leaves 200
+"""
+import argparse
+import time
+
+import plotly.express as px
+import plotly.io as pio
+
+from aggregates import compute_aggregates
+from benchmarks.bench_aggregates import synthetic_frame
+from treemap import build_sector_figure, build_treemap_figure
+
+COLOR_SCALE = px.colors.diverging.RdYlGn
+
+
+def legacy_treemap(df, slice_factor, color_scale, height=625):
+    """The px.treemap figure the dashboard used to build on every rerun."""
+    fig = px.treemap(df, path=['sector', 'symbol'], values=slice_factor, color='pChange',
+                     color_continuous_scale=color_scale, custom_data=['pChange', 'ffmc', 'sector'])
+    fig.update_layout(margin=dict(t=30, l=0, r=0, b=0), height=height,
+                      paper_bgcolor="rgba(0, 0, 0, 0)", plot_bgcolor="rgba(0, 0, 0, 0)")
+    fig.update_traces(
+        hovertemplate=('<b>%{label}</b><br>Sector: %{customdata[2]}<br>Size: %{value}<br>'
+                       'Market Cap: %{customdata[1]:,.0f} Cr<br>pChange: %{customdata[0]:.2f}%'),
+        texttemplate='%{label}<br>%{customdata[0]:.2f}%', textposition='middle center', textinfo="label+text",
+        marker=dict(cornerradius=8, line=dict(width=2, color='#ffffff')))
+    fig.update_coloraxes(showscale=False)
+    return fig
+
+
+def measure(build, repeat):
+    best, payload = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fig = build()
+        payload = pio.to_json(fig, validate=False)
+        best = min(best, time.perf_counter() - start)
+    return best, len(payload)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--leaves', type=int, nargs='+', default=[50, 500, 750])
+    parser.add_argument('--max-leaves', type=int, default=200, help="leaf cap for the collapsed variant")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    variants = (
+        ('px.treemap (legacy)', lambda df: legacy_treemap(df, 'ffmc', COLOR_SCALE)),
+        ('go.Treemap arrays', lambda df: build_treemap_figure(df, 'ffmc', COLOR_SCALE, 625)),
+        (f'go.Treemap, <= {args.max_leaves} leaves',
+         lambda df: build_treemap_figure(df, 'ffmc', COLOR_SCALE, 625, args.max_leaves)),
+        ('sector rollup', lambda df: build_sector_figure(compute_aggregates(df).sectors, COLOR_SCALE, 625)),
+    )
+    print(f"{'leaves':>6}  {'variant':<28} {'build+serialise':>16} {'payload':>10}")
+    for leaves in args.leaves:
+        df = synthetic_frame(leaves)
+        for name, build in variants:
+            seconds, size = measure(lambda: build(df), args.repeat)
+            print(f"{leaves:>6}  {name:<28} {seconds * 1e3:>13.1f} ms {size / 1024:>7.1f} KB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""
+Recorded upstream responses for offline benchmarks, and the stand-in servers that replay them.
+
+A fixture file (gzipped JSON) holds what the dashboard reads from each upstream:
+
+    {'nse':   { index name : equity-stockIndices body },
+     'yahoo': { yf_symbol : quoteSummary body },
+     'groq':  { index name : summary text },
+     'recorded_at': ISO timestamp, or None if not recorded,
+     'source': where the data came from}
+
+`record` is the only part that talks to the real services; `synthetic` builds a
+deterministic fixture of any size without them, for scaling runs. `serve` starts
+NSE, Yahoo and Groq stubs over a fixture and points the app's config at them.
+
+DEFAULT_FIXTURE, the one bench_load replays by default, covers NIFTY 50, NIFTY
+BANK and a total market trimmed to their constituents. It was built with
+`from_members` from the real memberships and sector_map.csv, with stub quotes,
+because NSE and Yahoo could not be reached when it was committed; check its
+'source' field, and refresh it from the live services with
+
+    python -m benchmarks.fixtures --record benchmarks/data/fixture.json.gz --indices "NIFTY 50" "NIFTY BANK"
+"""
+import argparse
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from contextlib import ExitStack, contextmanager
+
+from benchmarks.stubs import GroqStub, NSEStub, YahooStub, equity_stock_indices_payload, quote_summary_payload
+
+TOTAL_MARKET = 'NIFTY TOTAL MARKET'
+SYNTHETIC_INDICES = [TOTAL_MARKET, 'NIFTY 50', 'NIFTY NEXT 50', 'NIFTY BANK', 'NIFTY IT']
+DEFAULT_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'fixture.json.gz')
+NIFTY_BANK = ['HDFCBANK', 'ICICIBANK', 'SBIN', 'KOTAKBANK', 'AXISBANK', 'INDUSINDBK', 'BANKBARODA', 'PNB',
+              'CANBK', 'FEDERALBNK', 'IDFCFIRSTB', 'AUBANK']
+
+
+def synthetic(total=750, indices=SYNTHETIC_INDICES):
+    """
+    Fixture for a universe of `total` symbols. Every index in `indices` gets a
+    deterministic slice of the universe; NIFTY 50 is the first 50 symbols and the
+    total market all of them. Other indices come back empty from the NSE stub.
+    """
+    symbols = [f"S{i:03d}" for i in range(total)]
+    nse = {}
+    for name in indices:
+        if name == TOTAL_MARKET:
+            members = symbols
+        elif name == 'NIFTY 50':
+            members = symbols[:50]
+        else:
+            seed = int(hashlib.md5(name.encode()).hexdigest()[:8], 16)
+            size = min(total, 10 + seed % 240)
+            start = seed % max(1, total - size + 1)
+            members = symbols[start:start + size]
+        nse[name] = equity_stock_indices_payload(name, members)
+    yahoo = {f"{s}.NS": quote_summary_payload(f"{s}.NS") for s in symbols}
+    return {'nse': nse, 'yahoo': yahoo, 'groq': {}, 'recorded_at': None, 'source': f"synthetic({total})"}
+
+
+def from_members(members, sectors=None):
+    """
+    Fixture over real index memberships { index name : [symbols] } with stub quotes and
+    fundamentals; the total market is their union. `sectors` { yf_symbol : sector }
+    replaces the stub sectors, e.g. with sector_map.csv.
+    """
+    universe = list(dict.fromkeys(s for symbols in members.values() for s in symbols))
+    nse = {TOTAL_MARKET: equity_stock_indices_payload(TOTAL_MARKET, universe)}
+    nse.update({name: equity_stock_indices_payload(name, symbols) for name, symbols in members.items()})
+    yahoo = {}
+    for symbol in universe:
+        body = quote_summary_payload(f"{symbol}.NS")
+        if sectors and f"{symbol}.NS" in sectors:
+            body['quoteSummary']['result'][0]['assetProfile']['sector'] = sectors[f"{symbol}.NS"]
+        yahoo[f"{symbol}.NS"] = body
+    return {'nse': nse, 'yahoo': yahoo, 'groq': {}, 'recorded_at': None,
+            'source': "real memberships and sectors, stub quotes and fundamentals (not recorded)"}
+
+
+def load(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save(fixtures, path):
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        json.dump(fixtures, f)
+
+
+def record(index_names, groq_api_key=None):
+    """Fetch the listed indices (plus the total market), their constituents' fundamentals and, with a key, summaries."""
+    from aggregates import compute_aggregates
+    from fundamentals import DEFAULT_FIELDS, FIELD_MODULES, get_yahoo_client
+    from insights import build_prompt, market_features
+    from market_data import parse_index_payload
+    from nse_client import get_nse_client
+
+    nse_client = get_nse_client()
+    names = list(dict.fromkeys([TOTAL_MARKET, *index_names]))
+    nse = {name: nse_client.equity_stock_indices(name) for name in names}
+
+    yahoo_client = get_yahoo_client()
+    modules = ','.join(sorted({FIELD_MODULES[f] for f in DEFAULT_FIELDS}))
+    yahoo = {}
+    for row in nse[TOTAL_MARKET].get('data', []):
+        if row.get('priority'):
+            continue
+        symbol = f"{row['symbol']}.NS"
+        try:
+            resp = yahoo_client._session.get(f"{yahoo_client.base_url}/v10/finance/quoteSummary/{symbol}",
+                                             params={'modules': modules, 'crumb': yahoo_client._get_crumb()},
+                                             timeout=yahoo_client.timeout)
+            if resp.ok:
+                yahoo[symbol] = resp.json()
+        except Exception as e:
+            print(f"skipping {symbol}: {e}")
+
+    groq = {}
+    if groq_api_key:
+        from llm_gateway import get_gateway
+        gateway = get_gateway(groq_api_key)
+        for name in names:
+            features = market_features(compute_aggregates(parse_index_payload(nse[name])))
+            groq[name] = gateway.complete(build_prompt(name, features))
+
+    return {'nse': nse, 'yahoo': yahoo, 'groq': groq, 'recorded_at': datetime.datetime.now().isoformat(),
+            'source': "recorded"}
+
+
+@contextmanager
+def serve(fixtures, latency=0.0, jitter=0.0, error_rate=0.0, llm_latency=None, seed=0):
+    """
+    Run NSE, Yahoo and Groq stubs over `fixtures` and point the app at them.
+
+    Sets the environment variables config.py reads, so it must run before the app
+    modules are imported. Stores, history and prices go to a fresh temporary
+    directory. Yields { 'nse' | 'yahoo' | 'groq' : stub }.
+    """
+    if 'config' in sys.modules:
+        raise RuntimeError("serve() must run before the app modules (and config) are imported")
+    faults = dict(jitter=jitter, error_rate=error_rate, seed=seed)
+    with ExitStack() as stack:
+        stubs = {
+            'nse': stack.enter_context(NSEStub({}, latency=latency, payloads=fixtures['nse'], **faults)),
+            'yahoo': stack.enter_context(YahooStub(latency=latency, payloads=fixtures['yahoo'], **faults)),
+            'groq': stack.enter_context(GroqStub(latency=latency if llm_latency is None else llm_latency,
+                                                 replies=fixtures.get('groq'), **faults)),
+        }
+        workdir = stack.enter_context(tempfile.TemporaryDirectory())
+        os.environ.update(NSE_BASE_URL=stubs['nse'].url, YAHOO_BASE_URL=stubs['yahoo'].url,
+                          YAHOO_COOKIE_URL=stubs['yahoo'].url, GROQ_BASE_URL=stubs['groq'].url,
+                          STORE_PATH=os.path.join(workdir, 'market.db'),
+                          HISTORY_DIR=os.path.join(workdir, 'history'), PRICES_DIR=os.path.join(workdir, 'prices'))
+        yield stubs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--record', default=DEFAULT_FIXTURE, help="fixture file to write (gzipped JSON)")
+    parser.add_argument('--indices', nargs='+', default=['NIFTY 50', 'NIFTY BANK'],
+                        help="indices to record besides the total market")
+    args = parser.parse_args()
+    fixtures = record(args.indices, os.environ.get('GROQ_API_KEY'))
+    save(fixtures, args.record)
+    print(f"recorded {len(fixtures['nse'])} indices, {len(fixtures['yahoo'])} quote summaries and "
+          f"{len(fixtures['groq'])} summaries to {args.record}")
+
+
+if __name__ == '__main__':
+    main()
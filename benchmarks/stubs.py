@@ -0,0 +1,229 @@
+"""Local stand-ins for the upstream HTTP endpoints, used by the benchmarks.
+
+Each stub runs a ThreadingHTTPServer on an ephemeral port in a daemon thread and
+adds a fixed `latency` (seconds) to every response to mimic a remote round-trip,
+plus up to `jitter` seconds of random delay. `error_rate` answers that fraction
+of requests with `error_status` instead, to exercise retries and fallbacks.
+"""
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+SECTORS = ['Financial Services', 'Technology', 'Industrials', 'Consumer Cyclical', 'Healthcare',
+           'Basic Materials', 'Energy', 'Consumer Defensive', 'Utilities', 'Real Estate']
+
+
+def _seed(symbol):
+    return int(hashlib.md5(symbol.encode()).hexdigest()[:8], 16)
+
+
+def quote_summary_payload(symbol):
+    """Deterministic quoteSummary body for `symbol`."""
+    seed = _seed(symbol)
+    raw = lambda v: {'raw': v, 'fmt': f"{v:.2f}"}
+    return {'quoteSummary': {'error': None, 'result': [{
+        'assetProfile': {'sector': SECTORS[seed % len(SECTORS)]},
+        'summaryDetail': {
+            'trailingPE': raw(5 + seed % 60),
+            'dividendYield': raw((seed % 400) / 10000),
+            'beta': raw(0.4 + (seed % 120) / 100),
+        },
+        'defaultKeyStatistics': {'priceToBook': raw(0.5 + (seed % 90) / 10)},
+    }]}}
+
+
+class StubServer:
+    """Base class: subclasses implement `route(method, path, query, body)` -> (status, headers, bytes)."""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, error_status=503, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests = 0
+        self.errors = 0  # injected error responses
+        self._random = random.Random(seed)
+        self._count_lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def _serve(self, method):
+                with stub._count_lock:
+                    stub.requests += 1
+                    delay = stub.latency + stub.jitter * stub._random.random()
+                    failed = stub._random.random() < stub.error_rate
+                    stub.errors += failed
+                if delay:
+                    time.sleep(delay)
+                parsed = urlparse(self.path)
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                if failed:
+                    status, headers, payload = stub.json_response({'error': 'injected'}, status=stub.error_status)
+                else:
+                    status, headers, payload = stub.route(method, parsed.path, parsed.query, body)
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self._serve('GET')
+
+            def do_POST(self):
+                self._serve('POST')
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def route(self, method, path, query, body):
+        raise NotImplementedError
+
+    @staticmethod
+    def json_response(obj, status=200, headers=None):
+        return status, {'Content-Type': 'application/json', **(headers or {})}, json.dumps(obj).encode()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class YahooStub(StubServer):
+    """Serves /v1/test/getcrumb and /v10/finance/quoteSummary/<symbol>, from `payloads` when recorded."""
+
+    def __init__(self, latency=0.0, payloads=None, **faults):
+        super().__init__(latency=latency, **faults)
+        self.payloads = payloads or {}  # { symbol : quoteSummary body }
+
+    def route(self, method, path, query, body):
+        if path == '/v1/test/getcrumb':
+            return 200, {'Content-Type': 'text/plain', 'Set-Cookie': 'A3=stub; Path=/'}, b'stubcrumb'
+        if path.startswith('/v10/finance/quoteSummary/'):
+            symbol = path.rsplit('/', 1)[1]
+            return self.json_response(self.payloads.get(symbol) or quote_summary_payload(symbol))
+        return 404, {}, b''
+
+
+def equity_stock_indices_payload(index_name, symbols):
+    """equity-stockIndices body: the index row first, then one row per constituent, with NSE's full field set."""
+    rows = [{'symbol': index_name, 'priority': 1, 'pChange': 0.0, 'ffmc': 0.0}]
+    archives = 'https://nsearchives.nseindia.com'
+    for symbol in symbols:
+        seed = _seed(symbol)
+        last = 50 + seed % 5000
+        change = round(((seed % 1000) - 500) / 100, 2)
+        rows.append({
+            'priority': 0,
+            'symbol': symbol,
+            'identifier': f"{symbol}EQN",
+            'series': 'EQ',
+            'open': last - change, 'dayHigh': last * 1.01, 'dayLow': last * 0.99,
+            'lastPrice': last,
+            'previousClose': last - change,
+            'change': change,
+            'pChange': change,
+            'yearHigh': last * 1.3, 'yearLow': last * 0.7,
+            'totalTradedVolume': seed % 10_000_000,
+            'totalTradedValue': float(last * (seed % 10_000_000)),
+            'lastUpdateTime': '17-Oct-2025 16:00:00',
+            'nearWKH': 23.1, 'nearWKL': -42.9,
+            'perChange365d': round(((seed % 8000) - 3000) / 100, 2), 'date365dAgo': '17-Oct-2024',
+            'chart365dPath': f"{archives}/365d/{symbol}-EQ.svg",
+            'perChange30d': round(((seed % 2000) - 1000) / 100, 2), 'date30dAgo': '17-Sep-2025',
+            'chart30dPath': f"{archives}/30d/{symbol}-EQ.svg",
+            'chartTodayPath': f"{archives}/today/{symbol}EQN.svg",
+            'ffmc': float(10_000_000 * (100 + seed % 500_000)),
+            'meta': {'symbol': symbol, 'companyName': symbol, 'industry': SECTORS[seed % len(SECTORS)],
+                     'isin': f"INE{seed % 1_000_000:06d}01", 'listingDate': '2005-01-01', 'isFNOSec': bool(seed % 2),
+                     'activeSeries': ['EQ'], 'debtSeries': [], 'tempSuspendedSeries': []},
+        })
+    return {'name': index_name, 'data': rows}
+
+
+class NSEStub(StubServer):
+    """Serves the warm-up page (setting an `nsit` cookie) and /api/equity-stockIndices, from `payloads` when recorded."""
+
+    def __init__(self, indices, latency=0.0, cookie_max_age=240, payloads=None, **faults):
+        super().__init__(latency=latency, **faults)
+        self.indices = indices  # { index name : [symbols] }
+        self.payloads = payloads or {}  # { index name : equity-stockIndices body }
+        self.cookie_max_age = cookie_max_age
+        self.warmups = 0
+
+    def route(self, method, path, query, body):
+        if path.startswith('/market-data/'):
+            self.warmups += 1
+            return 200, {'Content-Type': 'text/html',
+                         'Set-Cookie': f"nsit=stub; Max-Age={self.cookie_max_age}; Path=/"}, b'<html></html>'
+        if path == '/api/equity-stockIndices':
+            index_name = parse_qs(query).get('index', [''])[0]
+            if index_name in self.payloads:
+                return self.json_response(self.payloads[index_name])
+            if index_name not in self.indices:
+                return self.json_response({'data': []})
+            return self.json_response(equity_stock_indices_payload(index_name, self.indices[index_name]))
+        return 404, {}, b''
+
+
+class GroqStub(StubServer):
+    """
+    OpenAI-compatible /openai/v1/chat/completions, streamed (SSE) or not; `latency` applies per request.
+
+    `replies` maps index names to recorded summaries; a prompt about an index not
+    in it gets `reply`.
+    """
+
+    def __init__(self, latency=0.0, reply="Index closed higher on broad-based buying. Breadth was positive.",
+                 chunk_words=3, rate_limit_first=0, retry_after=0.1, replies=None, **faults):
+        super().__init__(latency=latency, **faults)
+        self.reply = reply
+        self.replies = replies or {}
+        self.chunk_words = chunk_words
+        self.rate_limit_first = rate_limit_first  # answer this many requests with 429 first
+        self.retry_after = retry_after
+        self.prompts = []
+
+    def route(self, method, path, query, body):
+        if path != '/openai/v1/chat/completions':
+            return 404, {}, b''
+        with self._count_lock:
+            limited = self.rate_limit_first > 0
+            self.rate_limit_first -= limited
+        if limited:
+            return self.json_response({'error': {'message': 'Rate limit reached', 'type': 'requests'}},
+                                      status=429, headers={'Retry-After': str(self.retry_after)})
+        request = json.loads(body or b'{}')
+        prompt = request['messages'][-1]['content']
+        self.prompts.append(prompt)
+        reply = next((text for name, text in self.replies.items() if f" {name} index" in prompt), self.reply)
+        base = {'id': 'stub', 'created': int(time.time()), 'model': request.get('model', 'stub')}
+        if not request.get('stream'):
+            return self.json_response({**base, 'object': 'chat.completion', 'choices': [
+                {'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': reply}}]})
+        words = reply.split(' ')
+        events = []
+        for i in range(0, len(words), self.chunk_words):
+            text = ' '.join(words[i:i + self.chunk_words]) + ('' if i + self.chunk_words >= len(words) else ' ')
+            chunk = {**base, 'object': 'chat.completion.chunk',
+                     'choices': [{'index': 0, 'delta': {'content': text}, 'finish_reason': None}]}
+            events.append(f"data: {json.dumps(chunk)}\n\n")
+        events.append("data: [DONE]\n\n")
+        return 200, {'Content-Type': 'text/event-stream'}, ''.join(events).encode()
@@ -0,0 +1,26 @@
+"""Small Plotly figures for the dashboard; treemaps live in `treemap.py`."""
+import plotly.graph_objects as go
+
+BREADTH_COLORS = ['#3AA864', '#F38039', '#F2F2F2']  # advances, declines, no change
+
+
+# ---------------------- PIE CHART FUNCTION ----------------------
+def build_pie_chart(agg):
+    advances, declines, no_change = agg.advances, agg.declines, agg.unchanged
+
+    fig = go.Figure(go.Pie(
+        labels=['Advances', 'Declines', 'No Change'],
+        values=[advances, declines, no_change],
+        marker=dict(colors=BREADTH_COLORS, line=dict(color='#ffffff', width=2)),
+        hole=0.7, textinfo='none', sort=False,
+    ))
+    fig.update_layout(
+        width=150, height=150, showlegend=False,
+        annotations=[dict(
+            text=f'Positive: {advances}<br>Negative: {declines}<br>',
+            x=0.5, y=0.5, font_size=12, showarrow=False, font_color='#333333'
+        )],
+        margin=dict(l=0, r=0, t=0, b=0),
+        paper_bgcolor="rgba(0,0,0,0)"
+    )
+    return fig
@@ -0,0 +1,92 @@
+"""Per-upstream circuit breakers, so a struggling endpoint is not hammered by every rerun.
+
+Each upstream (NSE, Yahoo, Groq) has one process-wide breaker. After
+BREAKER_FAILURES consecutive failures it opens and callers fail fast with
+`CircuitOpenError` instead of waiting on timeouts; after BREAKER_COOLDOWN
+seconds a single probe request is let through, and its outcome closes the
+circuit or opens it for another cooldown. Callers keep serving their last good
+data in the meantime.
+"""
+import threading
+import time
+
+import config
+from metrics import register_collector
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """The upstream's circuit is open; the request was not sent."""
+
+
+class CircuitBreaker:
+    def __init__(self, name, failures=None, cooldown=None):
+        self.name = name
+        self.max_failures = failures or config.BREAKER_FAILURES
+        self.cooldown = config.BREAKER_COOLDOWN if cooldown is None else cooldown
+        self.state = CLOSED
+        self._failures = 0  # consecutive
+        self._opened_at = 0.0
+        self._last_error = None
+        self._stats = {'opened': 0, 'rejected': 0}
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True if a request may go out now; in half-open state only the one probe is allowed."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now = time.monotonic()
+            if now - self._opened_at >= self.cooldown:  # cooled down, or the last probe never reported back
+                self.state, self._opened_at = HALF_OPEN, now
+                return True  # this caller is the probe
+            self._stats['rejected'] += 1
+            return False
+
+    def check(self):
+        """Raise CircuitOpenError unless a request may go out now."""
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} circuit open after repeated failures (last: {self._last_error}); "
+                                   f"next attempt in {self.retry_in():.0f} s")
+
+    def success(self):
+        with self._lock:
+            self.state = CLOSED
+            self._failures = 0
+
+    def failure(self, error=None):
+        with self._lock:
+            self._failures += 1
+            self._last_error = str(error) if error is not None else self._last_error
+            if self.state == HALF_OPEN or (self.state == CLOSED and self._failures >= self.max_failures):
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+                self._stats['opened'] += 1
+
+    def retry_in(self):
+        """Seconds until the next probe is allowed (0 while closed)."""
+        if self.state == CLOSED:
+            return 0.0
+        return max(0.0, self.cooldown - (time.monotonic() - self._opened_at))
+
+    @property
+    def closed(self):
+        return self.state == CLOSED
+
+    def stats(self):
+        with self._lock:
+            return {'open': int(self.state != CLOSED), 'consecutive_failures': self._failures, **self._stats}
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name):
+    """The process-wide breaker for one upstream ('nse', 'yahoo', 'groq')."""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+            register_collector(f"breaker_{name}", _breakers[name].stats)
+        return _breakers[name]
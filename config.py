@@ -0,0 +1,78 @@
+"""Runtime tunables for the dashboard's data layer.
+
+Every value can be overridden through an environment variable of the same name,
+which is how the benchmarks point the app at local stand-in servers.
+"""
+import os
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+# ---------------------- NSE ----------------------
+NSE_BASE_URL = os.environ.get("NSE_BASE_URL", "https://www.nseindia.com").rstrip("/")
+NSE_TIMEOUT = _env_float("NSE_TIMEOUT", 5.0)  # seconds, per HTTP request
+NSE_COOKIE_TTL = _env_float("NSE_COOKIE_TTL", 240.0)  # re-warm after this long if cookies carry no expiry
+NSE_POOL_SIZE = _env_int("NSE_POOL_SIZE", 10)
+
+# ---------------------- BACKGROUND POLLER ----------------------
+POLL_INTERVAL = _env_float("POLL_INTERVAL", 300.0)  # seconds between refreshes of every index
+STALE_AFTER = _env_float("STALE_AFTER", 1.5 * POLL_INTERVAL)  # older snapshots are flagged and revalidated on read
+POLL_WORKERS = _env_int("POLL_WORKERS", 4)  # indices fetched concurrently when memberships refresh
+MEMBERSHIP_TTL = _env_float("MEMBERSHIP_TTL", 86400)  # index constituents are refreshed daily
+
+# ---------------------- YAHOO FINANCE ----------------------
+YAHOO_BASE_URL = os.environ.get("YAHOO_BASE_URL", "https://query2.finance.yahoo.com").rstrip("/")
+YAHOO_COOKIE_URL = os.environ.get("YAHOO_COOKIE_URL", "https://fc.yahoo.com")
+YAHOO_TIMEOUT = _env_float("YAHOO_TIMEOUT", 10.0)  # seconds, per HTTP request
+
+# ---------------------- FUNDAMENTALS FETCH ----------------------
+FUNDAMENTALS_WORKERS = _env_int("FUNDAMENTALS_WORKERS", 16)
+FUNDAMENTALS_RETRIES = _env_int("FUNDAMENTALS_RETRIES", 3)
+FUNDAMENTALS_BACKOFF = _env_float("FUNDAMENTALS_BACKOFF", 0.5)  # seconds, doubled on every retry
+
+# ---------------------- PRICE HISTORY ----------------------
+PRICES_BATCH = _env_int("PRICES_BATCH", 200)  # symbols per bulk yf.download call
+
+# ---------------------- PERSISTENT STORE ----------------------
+DATA_DIR = os.environ.get("DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+STORE_PATH = os.environ.get("STORE_PATH", os.path.join(DATA_DIR, "market.db"))
+SECTOR_TTL = _env_float("SECTOR_TTL", 30 * 86400)  # sectors rarely change
+VALUATION_TTL = _env_float("VALUATION_TTL", 86400)  # P/E, P/B, dividend yield, beta
+FIELD_TTLS = {"sector": SECTOR_TTL}
+HISTORY_DIR = os.environ.get("HISTORY_DIR", os.path.join(DATA_DIR, "history"))  # one folder of Parquet deltas per day
+PRICES_DIR = os.environ.get("PRICES_DIR", os.path.join(DATA_DIR, "prices"))  # daily OHLCV as Parquet parts
+SECTOR_SEED_PATH = os.environ.get("SECTOR_SEED_PATH",
+                                  os.path.join(os.path.dirname(os.path.abspath(__file__)), "sector_map.csv"))
+
+# ---------------------- DASHBOARD ----------------------
+MAX_COMPARE_INDICES = _env_int("MAX_COMPARE_INDICES", 3)  # indices load in parallel, so this is a layout limit
+TREEMAP_MAX_LEAVES = _env_int("TREEMAP_MAX_LEAVES", 0)  # above this, small stocks fold into "Others"; 0 = never
+DEBUG_PANEL = os.environ.get("DEBUG_PANEL", "").lower() in ("1", "true", "yes")  # debug panel on by default
+SUMMARY_TTL = _env_float("SUMMARY_TTL", 900)  # seconds an AI summary is reused for similar snapshots
+
+# ---------------------- SNAPSHOT API ----------------------
+API_HOST = os.environ.get("API_HOST", "127.0.0.1")
+API_PORT = _env_int("API_PORT", 0)  # > 0 also serves the API from the dashboard process; 0 = off
+
+# ---------------------- CIRCUIT BREAKERS ----------------------
+BREAKER_FAILURES = _env_int("BREAKER_FAILURES", 5)  # consecutive failures that open an upstream's circuit
+BREAKER_COOLDOWN = _env_float("BREAKER_COOLDOWN", 30.0)  # seconds before a probe request is let through
+
+# ---------------------- LLM GATEWAY ----------------------
+GROQ_BASE_URL = os.environ.get("GROQ_BASE_URL") or None  # None: the Groq SDK's default endpoint
+LLM_CONCURRENCY = _env_int("LLM_CONCURRENCY", 4)  # completions in flight at once, process-wide
+LLM_MAX_RETRIES = _env_int("LLM_MAX_RETRIES", 3)
+LLM_BACKOFF = _env_float("LLM_BACKOFF", 1.0)  # seconds, when the server sends no Retry-After
+LLM_TIMEOUT = _env_float("LLM_TIMEOUT", 30.0)
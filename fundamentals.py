@@ -0,0 +1,202 @@
+"""Concurrent fundamentals fetch from Yahoo Finance's quoteSummary endpoint.
+
+`fetch_fundamentals` fans the symbols out over a bounded thread pool sharing one
+pooled HTTP session. Every request has its own timeout, transient failures are
+retried with exponential backoff, and symbols that still fail are reported in
+`FundamentalsResult.errors` instead of failing the whole batch.
+"""
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import config
+from circuit import get_breaker
+from metrics import timed
+
+# Field name (as used by yfinance's `.info`) -> quoteSummary module that carries it
+FIELD_MODULES = {
+    'sector': 'assetProfile',
+    'trailingPE': 'summaryDetail',
+    'dividendYield': 'summaryDetail',
+    'beta': 'summaryDetail',
+    'priceToBook': 'defaultKeyStatistics',
+}
+DEFAULT_FIELDS = tuple(FIELD_MODULES)
+VALUATION_FIELDS = ('trailingPE', 'priceToBook', 'dividendYield', 'beta')
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class FetchError(Exception):
+    """A symbol could not be fetched; `retryable` tells whether another attempt may help."""
+
+    def __init__(self, message, retryable=True, retry_after=None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+@dataclass
+class FundamentalsResult:
+    data: dict = field(default_factory=dict)  # { yf_symbol : { field : value } }
+    errors: dict = field(default_factory=dict)  # { yf_symbol : error message }
+    elapsed: float = 0.0
+
+    @property
+    def requested(self):
+        return len(self.data) + len(self.errors)
+
+
+def _retry_after(response):
+    try:
+        return float(response.headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+def _flatten(payload, fields):
+    result = (payload.get('quoteSummary') or {}).get('result') or []
+    if not result:
+        raise FetchError("empty quoteSummary result", retryable=False)
+    modules = result[0]
+    row = {}
+    for field_name in fields:
+        value = (modules.get(FIELD_MODULES[field_name]) or {}).get(field_name)
+        if isinstance(value, dict):  # numeric fields come as {"raw": 1.2, "fmt": "1.20"}
+            value = value.get('raw')
+        row[field_name] = value
+    return row
+
+
+class YahooClient:
+    """Thread-safe quoteSummary client with a pooled session and a shared crumb."""
+
+    def __init__(self, base_url=None, cookie_url=None, timeout=None, pool_size=None):
+        self.base_url = (base_url or config.YAHOO_BASE_URL).rstrip('/')
+        self.cookie_url = cookie_url or config.YAHOO_COOKIE_URL
+        self.timeout = timeout or config.YAHOO_TIMEOUT
+        pool_size = pool_size or config.FUNDAMENTALS_WORKERS
+
+        self._session = requests.Session()
+        self._session.headers.update({'User-Agent': 'Mozilla/5.0', 'Accept': 'application/json'})
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+        self._crumb = None
+        self._lock = threading.Lock()
+        self._breaker = get_breaker('yahoo')
+
+    def _get_crumb(self, stale=None):
+        # Only one thread negotiates a crumb; the others reuse whatever it obtained.
+        with self._lock:
+            if self._crumb is None or self._crumb == stale:
+                try:
+                    self._session.get(self.cookie_url, timeout=self.timeout)  # sets the auth cookie, status is irrelevant
+                    resp = self._session.get(f"{self.base_url}/v1/test/getcrumb", timeout=self.timeout)
+                    resp.raise_for_status()
+                except requests.RequestException as e:
+                    raise FetchError(f"crumb negotiation failed: {e}") from e
+                self._crumb = resp.text.strip()
+            return self._crumb
+
+    def quote_summary(self, symbol, fields=DEFAULT_FIELDS):
+        """One attempt at fetching `fields` for `symbol`; raises FetchError on failure."""
+        breaker = self._breaker
+        if not breaker.allow():
+            raise FetchError(f"Yahoo Finance circuit open, retrying in {breaker.retry_in():.0f} s", retryable=False)
+        try:
+            row = self._quote_summary(symbol, fields)
+        except FetchError as e:
+            if e.retryable:  # timeouts, 429 and 5xx; a symbol Yahoo does not know says nothing about Yahoo
+                breaker.failure(e)
+            else:
+                breaker.success()
+            raise
+        breaker.success()
+        return row
+
+    def _quote_summary(self, symbol, fields):
+        modules = ','.join(sorted({FIELD_MODULES[f] for f in fields}))
+        url = f"{self.base_url}/v10/finance/quoteSummary/{symbol}"
+        crumb = self._get_crumb()
+        for reauth in (False, True):
+            try:
+                resp = self._session.get(url, params={'modules': modules, 'crumb': crumb}, timeout=self.timeout)
+            except requests.RequestException as e:
+                raise FetchError(f"{type(e).__name__}: {e}") from e
+
+            if resp.status_code in (401, 403) and not reauth:
+                crumb = self._get_crumb(stale=crumb)
+                continue
+            if resp.status_code in RETRY_STATUSES:
+                raise FetchError(f"HTTP {resp.status_code}", retry_after=_retry_after(resp))
+            if not resp.ok:
+                raise FetchError(f"HTTP {resp.status_code}", retryable=False)
+            try:
+                return _flatten(resp.json(), fields)
+            except ValueError as e:
+                raise FetchError(f"invalid JSON: {e}") from e
+        raise FetchError("not authorised after crumb refresh", retryable=False)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_yahoo_client():
+    """Process-wide YahooClient, so every caller shares one connection pool and crumb."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = YahooClient()
+        return _client
+
+
+def _fetch_with_retry(client, symbol, fields, retries, backoff):
+    for attempt in range(retries + 1):
+        try:
+            return client.quote_summary(symbol, fields)
+        except FetchError as e:
+            if not e.retryable or attempt == retries:
+                raise
+            delay = e.retry_after if e.retry_after is not None else backoff * (2 ** attempt)
+            time.sleep(delay + random.uniform(0, backoff))
+
+
+@timed('yahoo.fundamentals')
+def fetch_fundamentals(symbols, fields=DEFAULT_FIELDS, max_workers=None, retries=None, backoff=None,
+                       client=None, on_progress=None):
+    """
+    Fetch `fields` for every symbol concurrently and return a FundamentalsResult.
+
+    `on_progress(done, total)` is called from the calling thread as results
+    arrive, so it is safe to drive Streamlit widgets from it.
+    """
+    client = client or get_yahoo_client()
+    max_workers = max_workers or config.FUNDAMENTALS_WORKERS
+    retries = config.FUNDAMENTALS_RETRIES if retries is None else retries
+    backoff = config.FUNDAMENTALS_BACKOFF if backoff is None else backoff
+    symbols = list(dict.fromkeys(symbols))  # de-duplicate, keep order
+
+    result = FundamentalsResult()
+    if not symbols:
+        return result
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(symbols)), thread_name_prefix='fundamentals') as pool:
+        futures = {pool.submit(_fetch_with_retry, client, s, fields, retries, backoff): s for s in symbols}
+        for done, future in enumerate(as_completed(futures), start=1):
+            symbol = futures[future]
+            try:
+                result.data[symbol] = future.result()
+            except Exception as e:  # partial results: one bad symbol never sinks the batch
+                result.errors[symbol] = str(e)
+            if on_progress:
+                on_progress(done, len(symbols))
+    result.elapsed = time.perf_counter() - start
+    return result
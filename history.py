@@ -0,0 +1,189 @@
+"""Append-only intraday history of NIFTY TOTAL MARKET snapshots, for replay without network access.
+
+Each poll appends one small Parquet file under `HISTORY_DIR/<date>/`, holding
+only the symbols whose quote changed since the previous poll (the first poll of
+the day, or after a restart, is written in full). A day is read back with a
+single `read_table` over its parts and any point in time is rebuilt by
+taking the latest row per symbol at or before it. Every other index is derived
+from the rebuilt universe through the membership index, as for live data.
+"""
+import datetime
+import logging
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+import config
+from metrics import timed
+from sectors import UNKNOWN_SECTOR
+
+log = logging.getLogger(__name__)
+
+# Quote columns kept per symbol; anything else in the NSE payload is not replayed
+HISTORY_COLUMNS = {
+    # column : stored dtype
+    'lastPrice': 'float64',
+    'change': 'float32',
+    'pChange': 'float32',
+    'ffmc': 'float32',  # crores, already rounded to whole numbers
+    'totalTradedVolume': 'float64',
+}
+_TS_FORMAT = '%H%M%S'
+
+
+def _pyarrow():
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    return pa, pq
+
+
+def _quotes(frame):
+    """Universe frame reduced to the stored columns, one row per symbol, indexed by symbol."""
+    frame = frame.drop_duplicates('symbol')
+    # Plain strings: a categorical index carries its poll's categories, and frames with
+    # different categories cannot be compared when the universe's membership changes
+    frame = frame.set_index(frame['symbol'].astype(str).rename('symbol'))
+    quotes = pd.DataFrame(index=frame.index)
+    for column, dtype in HISTORY_COLUMNS.items():
+        if column in frame.columns:
+            quotes[column] = pd.to_numeric(frame[column], errors='coerce').astype(dtype)
+        else:
+            quotes[column] = np.full(len(frame), np.nan, dtype=dtype)
+    quotes['sector'] = frame['sector'].astype(str) if 'sector' in frame.columns else UNKNOWN_SECTOR
+    return quotes
+
+
+def _changed(current, previous):
+    """Symbols that are new or whose stored values differ from `previous`, plus symbols that left."""
+    common = current.index.intersection(previous.index)
+    a, b = current.loc[common], previous.loc[common]
+    differs = ((a != b) & ~(a.isna() & b.isna())).any(axis=1)
+    changed = current.index.difference(previous.index).union(common[differs.to_numpy()])
+    removed = previous.index.difference(current.index)
+    return changed, removed
+
+
+class DayHistory:
+    """Every delta of one trading day, concatenated and ordered by poll time."""
+
+    def __init__(self, table):
+        self.rows = table.sort_values('ts', kind='stable').reset_index(drop=True)
+        self.times = list(pd.DatetimeIndex(self.rows['ts'].unique()).to_pydatetime())
+
+    def frame_at(self, at):
+        """The universe as it stood at the last poll at or before `at` (empty before the first one)."""
+        rows = self.rows[self.rows['ts'] <= pd.Timestamp(at)]
+        latest = rows.drop_duplicates('symbol', keep='last')
+        latest = latest[~latest['deleted']].drop(columns=['ts', 'deleted'])
+        frame = latest.reset_index(drop=True)
+        frame['symbol'] = frame['symbol'].astype(str)
+        frame['sector'] = frame['sector'].astype(str)
+        frame['yf_symbol'] = frame['symbol'] + '.NS'
+        return frame
+
+
+class HistoryStore:
+    def __init__(self, root=None):
+        self.root = root or config.HISTORY_DIR
+        self._last = None  # (date, quotes frame) of the latest write, to diff the next poll against
+        self._days = {}  # { date : (parts on disk, DayHistory) }
+        self._lock = threading.Lock()
+
+    def _day_dir(self, day):
+        return os.path.join(self.root, day.isoformat())
+
+    def days(self):
+        """Dates with recorded history, newest first."""
+        if not os.path.isdir(self.root):
+            return []
+        days = []
+        for name in os.listdir(self.root):
+            try:
+                days.append(datetime.date.fromisoformat(name))
+            except ValueError:
+                continue
+        return sorted(days, reverse=True)
+
+    def _parts(self, day):
+        directory = self._day_dir(day)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name for name in os.listdir(directory) if name.endswith('.parquet'))
+
+    @timed('history.append')
+    def append(self, frame, fetched_at):
+        """Record one universe poll; writes only the rows that changed since the previous one."""
+        pa, pq = _pyarrow()
+        day = fetched_at.date()
+        quotes = _quotes(frame)
+        with self._lock:
+            if self._last is None or self._last[0] != day:
+                # After a restart, diff against what is already on disk for today
+                previous = self.load(day)
+                previous = (previous.frame_at(fetched_at).set_index('symbol')[list(quotes.columns)]
+                            if previous is not None else None)
+            else:
+                previous = self._last[1]
+
+            if previous is None or previous.empty:
+                delta, removed = quotes, pd.Index([])
+            else:
+                changed, removed = _changed(quotes, previous)
+                delta = quotes.loc[changed]
+            if removed.empty and delta.empty:
+                self._last = (day, quotes)
+                return 0
+
+            gone = pd.DataFrame(index=removed, columns=quotes.columns).astype(quotes.dtypes.to_dict())
+            rows = pd.concat([delta.assign(deleted=False), gone.assign(deleted=True)])
+            rows = rows.rename_axis('symbol').reset_index()
+            rows.insert(0, 'ts', pd.Timestamp(fetched_at).as_unit('us'))
+            table = pa.Table.from_pandas(rows, preserve_index=False)
+            for column in ('symbol', 'sector'):
+                i = table.schema.get_field_index(column)
+                table = table.set_column(i, column, table.column(column).dictionary_encode())
+
+            directory = self._day_dir(day)
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, fetched_at.strftime(_TS_FORMAT) + '.parquet')
+            pq.write_table(table, path + '.tmp', compression='zstd')
+            os.replace(path + '.tmp', path)  # readers never see a half-written part
+            self._last = (day, quotes)
+        return len(rows)
+
+    def load(self, day):
+        """All deltas of `day`; parts already read are kept, so only newly landed ones hit the disk. None if empty."""
+        parts = self._parts(day)
+        if not parts:
+            return None
+        read, history = self._days.get(day, (0, None))
+        if read == len(parts):
+            return history
+        _, pq = _pyarrow()
+        directory = self._day_dir(day)
+        table = pq.read_table([os.path.join(directory, name) for name in parts[read:]]).to_pandas()
+        if history is not None:
+            table = pd.concat([history.rows, table], ignore_index=True)
+        history = DayHistory(table)
+        self._days[day] = (len(parts), history)
+        return history
+
+    def times(self, day):
+        """Poll times recorded on `day`, oldest first."""
+        history = self.load(day)
+        return history.times if history is not None else []
+
+
+_history = None
+_history_lock = threading.Lock()
+
+
+def get_history():
+    """Process-wide HistoryStore at config.HISTORY_DIR."""
+    global _history
+    with _history_lock:
+        if _history is None:
+            _history = HistoryStore()
+        return _history
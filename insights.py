@@ -0,0 +1,121 @@
+"""AI market summaries: compact feature payload, quantised cache and token streaming.
+
+Instead of shipping `df.describe()` to the LLM, `market_features` reduces a
+snapshot to the handful of numbers the summary is actually about. The cache key
+is those features rounded to coarse steps, so two snapshots a few ticks apart
+share one summary instead of costing another LLM call.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import config
+from metrics import cache_hit, cache_miss
+
+ERROR_PREFIX = "Error generating AI insights"
+
+
+def _round_to(value, step):
+    return round(round(value / step) * step, 4)
+
+
+def _stat(value):
+    return 0.0 if value != value else round(float(value), 2)  # NaN (empty frame) -> 0.0
+
+
+def market_features(aggregates, top_sectors=3):
+    """Small, purpose-built summary of one index snapshot, from its MarketAggregates."""
+    features = {
+        'stocks': aggregates.stocks,
+        'advances': aggregates.advances,
+        'declines': aggregates.declines,
+        'avg_return': _stat(aggregates.equal_weighted_return),
+        'cap_weighted_return': _stat(aggregates.cap_weighted_return),
+        'dispersion': _stat(aggregates.dispersion),
+    }
+    sector_returns = aggregates.sectors['cap_weighted_return'].dropna().sort_values()
+    if len(sector_returns) > 1:
+        features['best_sectors'] = {k: _stat(v) for k, v in sector_returns.tail(top_sectors)[::-1].items()}
+        features['worst_sectors'] = {k: _stat(v) for k, v in sector_returns.head(top_sectors).items()}
+    return features
+
+
+def quantise(features):
+    """Hashable cache key: returns to 0.25 pp, breadth to 5% of the index, sector order only."""
+    stocks = max(features['stocks'], 1)
+    return (
+        features['stocks'],
+        _round_to(features['advances'] / stocks, 0.05),
+        _round_to(features['declines'] / stocks, 0.05),
+        _round_to(features['avg_return'], 0.25),
+        _round_to(features['cap_weighted_return'], 0.25),
+        _round_to(features['dispersion'], 0.25),
+        tuple(features.get('best_sectors', {})),
+        tuple(features.get('worst_sectors', {})),
+    )
+
+
+def build_prompt(index_name, features):
+    lines = [f"{k}: {v}" for k, v in features.items()]
+    return (
+        f"Summarize today's performance of the {index_name} index on NSE in under 70 words, "
+        f"in 4 simple lines: overall trend, breadth, market-cap impact, sector performance. "
+        f"Returns are % change. Keep it concise, neutral and data-driven, with no pre-text.\n"
+        + "\n".join(lines)
+    )
+
+
+class SummaryCache:
+    """Thread-safe LRU of summaries with a TTL, shared by every session in the process."""
+
+    def __init__(self, ttl=None, max_entries=256):
+        self.ttl = ttl or config.SUMMARY_TTL
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # { key : (text, stored_at) }
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry[1] > self.ttl:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, text):
+        with self._lock:
+            self._entries[key] = (text, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+summary_cache = SummaryCache()
+
+
+def stream_summary(index_name, features, api_key):
+    """
+    Yield the summary for one snapshot chunk by chunk.
+
+    A cached summary for near-identical features is yielded at once; otherwise the
+    completion is streamed through the shared LLM gateway and cached when
+    complete. Failures are yielded as an error line, never raised, and never cached.
+    """
+    key = (index_name, quantise(features))
+    cached = summary_cache.get(key)
+    if cached is not None:
+        cache_hit('summaries')
+        yield cached
+        return
+    cache_miss('summaries')
+
+    parts = []
+    try:
+        from llm_gateway import get_gateway  # loads the Groq SDK, so only once a summary is actually needed
+        for text in get_gateway(api_key).stream(build_prompt(index_name, features)):
+            parts.append(text)
+            yield text
+    except Exception as e:
+        yield f"{ERROR_PREFIX}: {str(e)}"
+        return
+    summary_cache.put(key, "".join(parts))
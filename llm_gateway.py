@@ -0,0 +1,188 @@
+"""Process-wide gateway for LLM completions.
+
+Every session shares one Groq client. Requests wait in a queue for one of
+LLM_CONCURRENCY slots, identical prompts already in flight are joined rather than
+sent again, and rate-limit responses are retried after the delay the server asks
+for. `metrics()` reports queue depth, latency and failure counters.
+"""
+import random
+import threading
+import time
+
+import groq
+from groq import Groq
+
+import config
+from circuit import get_breaker
+from metrics import register_collector, span
+
+MODEL = "llama-3.1-8b-instant"
+RETRYABLE = (groq.RateLimitError, groq.APITimeoutError, groq.APIConnectionError, groq.InternalServerError)
+
+
+def _retry_after(error, attempt):
+    """Seconds to wait before retrying: the server's Retry-After when given, else exponential backoff."""
+    response = getattr(error, 'response', None)
+    if response is not None:
+        headers = response.headers
+        try:
+            if headers.get('retry-after-ms'):
+                return float(headers['retry-after-ms']) / 1000
+            if headers.get('retry-after'):
+                return float(headers['retry-after'])
+        except ValueError:
+            pass
+    return config.LLM_BACKOFF * (2 ** attempt) + random.uniform(0, config.LLM_BACKOFF)
+
+
+class _Flight:
+    """One upstream completion, replayed to every caller that asked for the same prompt."""
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.cond = threading.Condition()
+
+    def publish(self, chunk=None, error=None, done=False):
+        with self.cond:
+            if chunk:
+                self.chunks.append(chunk)
+            if error is not None:
+                self.error = error
+            self.done = self.done or done
+            self.cond.notify_all()
+
+    def __iter__(self):
+        seen = 0
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: len(self.chunks) > seen or self.done)
+                new, done, error = self.chunks[seen:], self.done, self.error
+            seen += len(new)
+            yield from new
+            if done and seen == len(self.chunks):
+                if error is not None:
+                    raise error
+                return
+
+
+class LLMGateway:
+    def __init__(self, api_key, base_url=None, max_concurrency=None, max_retries=None, timeout=None):
+        # The SDK's own retries are off: retrying here keeps the slot accounting honest
+        self._client = Groq(api_key=api_key, base_url=base_url or config.GROQ_BASE_URL,
+                            timeout=timeout or config.LLM_TIMEOUT, max_retries=0)
+        self.max_retries = config.LLM_MAX_RETRIES if max_retries is None else max_retries
+        self._slots = threading.BoundedSemaphore(max_concurrency or config.LLM_CONCURRENCY)
+        self._breaker = get_breaker('groq')
+        self._inflight = {}  # { (model, prompt) : _Flight }
+        self._lock = threading.Lock()
+        self._stats = {'requests': 0, 'deduplicated': 0, 'queued': 0, 'active': 0, 'completed': 0,
+                       'failed': 0, 'retries': 0, 'rate_limited': 0,
+                       'wait_total': 0.0, 'latency_total': 0.0, 'latency_max': 0.0}
+
+    def _count(self, **deltas):
+        with self._lock:
+            for key, value in deltas.items():
+                self._stats[key] += value
+
+    def metrics(self):
+        """Queue depth and counters since start-up, with times in milliseconds."""
+        with self._lock:
+            s = dict(self._stats)
+        finished = s['completed'] + s['failed']
+        return {
+            'queue_depth': s['queued'],
+            'in_flight': s['active'],
+            'requests': s['requests'],
+            'deduplicated': s['deduplicated'],
+            'completed': s['completed'],
+            'failed': s['failed'],
+            'retries': s['retries'],
+            'rate_limited': s['rate_limited'],
+            'wait_avg_ms': round(1000 * s['wait_total'] / finished, 1) if finished else 0.0,
+            'latency_avg_ms': round(1000 * s['latency_total'] / s['completed'], 1) if s['completed'] else 0.0,
+            'latency_max_ms': round(1000 * s['latency_max'], 1),
+        }
+
+    def _run(self, flight, key, model, prompt):
+        queued_at = time.perf_counter()
+        self._count(queued=1)
+        self._slots.acquire()
+        started = time.perf_counter()
+        self._count(queued=-1, active=1, wait_total=started - queued_at)
+        try:
+            with span('llm.completion'):
+                for attempt in range(self.max_retries + 1):
+                    try:
+                        stream = self._client.chat.completions.create(
+                            messages=[{"role": "user", "content": prompt}], model=model, stream=True)
+                        for chunk in stream:
+                            text = chunk.choices[0].delta.content if chunk.choices else None
+                            if text:
+                                flight.publish(text)
+                        break
+                    except RETRYABLE as e:
+                        # Only retry before anything was streamed; a half-sent answer cannot be resumed
+                        if attempt == self.max_retries or flight.chunks:
+                            raise
+                        if isinstance(e, groq.RateLimitError):
+                            self._count(rate_limited=1)
+                        self._count(retries=1)
+                        time.sleep(_retry_after(e, attempt))
+            latency = time.perf_counter() - started
+            with self._lock:
+                self._stats['completed'] += 1
+                self._stats['latency_total'] += latency
+                self._stats['latency_max'] = max(self._stats['latency_max'], latency)
+            self._breaker.success()
+            flight.publish(done=True)
+        except Exception as e:
+            self._count(failed=1)
+            self._breaker.failure(e)
+            flight.publish(error=e, done=True)
+        finally:
+            self._count(active=-1)
+            self._slots.release()
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stream(self, prompt, model=MODEL):
+        """
+        Yield completion text chunks; raises the upstream error if the request finally fails.
+
+        Identical prompts already in flight are joined; a new request fails fast with
+        CircuitOpenError while Groq's circuit is open.
+        """
+        key = (model, prompt)
+        with self._lock:
+            self._stats['requests'] += 1
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                self._breaker.check()
+                flight = self._inflight[key] = _Flight()
+            else:
+                self._stats['deduplicated'] += 1
+        if leader:
+            threading.Thread(target=self._run, args=(flight, key, model, prompt),
+                             name='llm-gateway', daemon=True).start()
+        return iter(flight)
+
+    def complete(self, prompt, model=MODEL):
+        return "".join(self.stream(prompt, model))
+
+
+_gateway = None
+_gateway_key = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway(api_key):
+    """The process-wide gateway; rebuilt only if the API key changes."""
+    global _gateway, _gateway_key
+    with _gateway_lock:
+        if _gateway is None or api_key != _gateway_key:
+            _gateway, _gateway_key = LLMGateway(api_key), api_key
+            register_collector('llm', _gateway.metrics)
+        return _gateway
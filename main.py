@@ -1,371 +1,266 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import requests
 from streamlit_autorefresh import st_autorefresh
-import yfinance as yf
-import os
 import datetime
-from groq import Groq  # Add this import for Groq API
-
-# ---------------------- CUSTOM CSS FOR ULTIMATE BEAUTY ----------------------
-st.markdown("""
-    <style>
-    /* Global styles - Elegant, modern theme with gradients and shadows */
-    .stApp {
-        background: linear-gradient(to bottom right, #e6f0ff, #f0f4f8);
-        color: #1e1e1e;
-        font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-    }
-    /* Button styling - Vibrant, hover effects */
-    .stButton > button {
-        background: linear-gradient(135deg, #4CAF50, #45a049);
-        color: white;
-        border: none;
-        border-radius: 8px;
-        padding: 0.6rem 1.2rem;
-        box-shadow: 0 4px 6px rgba(0,0,0,0.1);
-        transition: all 0.3s ease;
-    }
-    .stButton > button:hover {
-        background: linear-gradient(135deg, #45a049, #4CAF50);
-        box-shadow: 0 6px 8px rgba(0,0,0,0.15);
-        transform: translateY(-2px);
-    }
-    /* Selectbox and multiselect - Clean, with subtle borders */
-    .stSelectbox > div, .stMultiselect > div {
-        background-color: #ffffff;
-        border: 1px solid #d1d1d1;
-        border-radius: 8px;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.05);
-    }
-    /* Header - Bold, centered with shadow */
-    h1 {
-        color: #007BFF;
-        text-align: center;
-        text-shadow: 1px 1px 2px rgba(0,0,0,0.1);
-    }
-    /* Caption - Elegant footer */
-    .stCaption {
-        text-align: center;
-        color: #666666;
-        font-style: italic;
-    }
-    /* Treemap - Enhanced hover and borders */
-    .modebar {
-        background-color: rgba(255,255,255,0.9) !important;
-        border-radius: 8px;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-    }
-    /* Pie chart - Smooth animations */
-    .js-plotly-plot .plotly .modebar {
-        left: 50%;
-        transform: translateX(-50%);
-    }
-    /* Expander - Card-like with subtle gradient */
-    .stExpander {
-        background: linear-gradient(to bottom, #ffffff, #f9f9f9);
-        border: 1px solid #e0e0e0;
-        border-radius: 12px;
-        box-shadow: 0 4px 8px rgba(0,0,0,0.05);
-        transition: all 0.3s ease;
-    }
-    .stExpander:hover {
-        box-shadow: 0 6px 12px rgba(0,0,0,0.1);
-    }
-    /* Spinner - Custom color */
-    .stSpinner {
-        color: #007BFF;
-    }
-    /* Divider - Stylish */
-    hr {
-        border: 0;
-        height: 1px;
-        background: linear-gradient(to right, transparent, #d1d1d1, transparent);
-    }
-    /* Add subtle animations for inputs */
-    input, select {
-        transition: border-color 0.3s ease;
-    }
-    input:focus, select:focus {
-        border-color: #007BFF !important;
-    }
-    /* Market details styling */
-    .market-details {
-        background: #f9f9f9;
-        border: 1px solid #e0e0e0;
-        border-radius: 8px;
-        padding: 1rem;
-        margin-top: 1rem;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.05);
-    }
-    </style>
-    """, unsafe_allow_html=True)
-
+import html
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from aggregates import Valuation, compute_aggregates, valuation_frame
+from api import serve_in_background
+from charts import build_pie_chart
+from circuit import get_breaker
+from config import API_PORT, DEBUG_PANEL, MAX_COMPARE_INDICES, STALE_AFTER
+from fundamentals import VALUATION_FIELDS
+from insights import ERROR_PREFIX, market_features, stream_summary
+from market_data import INDEX_LIST
+from membership import UNIVERSE
+from metrics import cache_data, current_trace, registry, span, start_trace, use_trace
+from poller import get_poller
+from prices import get_returns
+from store import get_fundamentals
+from styles import inject_css
+from treemap import cached_sector_treemap, cached_treemap
 
-# ---------------------- CACHING ----------------------
-@st.cache_data(ttl=86400)
-def get_sector_map_from_nse_total_market():
-    url = "https://nsearchives.nseindia.com/content/indices/ind_niftytotalmarket_list.csv"
-    try:
-        df_map = pd.read_csv(url)
-        # Create dict: { Symbol : Industry }
-        return df_map.set_index("Symbol")["Industry"].to_dict()
-    except Exception as e:
-        st.error(f"Failed to load sector data: {e}")
-        return {}
-
-
-import yfinance as yf
-import streamlit as st
-import pandas as pd
+# ---------------------- CONFIG ----------------------
+index_list = INDEX_LIST
 
+st.set_page_config(page_title='NSE Indices Heatmap Dashboard', layout="wide")
+trace = start_trace()  # stage timings of this rerun, for the debug panel
+inject_css()
+st_autorefresh(interval=300000, key="auto_refresh")
 
-@st.cache_data(ttl=86400)  # Cache data for 24 hours
-def get_sector_data_yfinance(symbols):
+# Headless JSON/Arrow API over this process's snapshots; off unless API_PORT is set
+if API_PORT:
+    serve_in_background()
 
-    sector_map = {}
-    total = len(symbols)
-    progress_bar = st.progress(0)
-    status_text = st.empty()
 
-    for i, symbol in enumerate(symbols):
-        try:
-            # Fetch ticker information
-            ticker = yf.Ticker(symbol)
-            info = ticker.info
-
-            # Extract sector if available
-            if 'sector' in info and info['sector']:
-                sector_map[symbol] = info['sector']
-            else:
-                # If sector is not found, you can assign a default value
-                sector_map[symbol] = "Unknown"
-
-            # Update progress
-            status_text.info(f"Fetching sector for {symbol}... ({i + 1}/{total})")
-            progress_bar.progress((i + 1) / total)
-
-        except Exception as e:
-            # Handle cases where a symbol might be delisted or invalid
-            status_text.warning(f"Could not retrieve data for {symbol}. Skipping. Error: {e}")
-            continue
+# ---------------------- DATA ----------------------
+def get_index_details(category, slice_by='Market Cap', sort_by=None, search=''):
+    """
+    Filtered frame, slice factor, colour scale and fetch time for one index, from the poller's latest snapshot.
 
-    progress_bar.empty()
-    return sector_map
-
-
-@st.cache_data(ttl=300)
-def get_index_details(category):
-    headers = {
-        'User-Agent': 'Mozilla/5.0',
-        "Accept": "application/json,text/html",
-        'Accept-Language': 'en-US,en;q=0.9'
-    }
-    category = category.upper().replace('&', '%26').replace(' ', '%20')
-    try:
-        session = requests.Session()
-        session.headers.update(headers)
-        ref_url = f"https://www.nseindia.com/market-data/live-equity-market?symbol={category}"
-        session.get(ref_url, timeout=5)  # warm-up
-        url = f"https://www.nseindia.com/api/equity-stockIndices?index={category}"
-        data = session.get(url, timeout=5).json()
-        df = pd.DataFrame(data['data'])
-        if not df.empty:
-            if "meta" in df.columns:
-                df = df.drop(["meta"], axis=1)
-            df = df.set_index("symbol", drop=True)
-            df['ffmc'] = round(df['ffmc'] / 10000000, 0)
-            df = df.iloc[1:].reset_index(drop=False)
-            df['yf_symbol'] = df['symbol'] + '.NS'
-        return df
-    except Exception:
-        return pd.DataFrame()
+    Slicing, sorting and searching are lookups into the snapshot's precomputed view, so
+    widget changes never re-run a pandas pipeline; (empty frame, None, None, None) if unavailable.
+    """
+    snapshot = get_poller().get(category)  # an in-memory view of the polled NIFTY TOTAL MARKET snapshot
+    if snapshot is None:
+        return pd.DataFrame(), None, None, None
+    df, slice_factor, color_scale = snapshot.view.select(slice_by, sort_by, search)
+    return df, slice_factor, color_scale, snapshot.fetched_at
 
 
 # ---------------------- NEW: GROQ API INTEGRATION ----------------------
-@st.cache_data(ttl=300)
-def get_market_details_groq(index_name, df_summary):
-
-    groq_api_key = st.secrets.get("GROQ_API_KEY")
-
+def require_groq_api_key():
     # Check if the key was found. If not, show an error and stop.
-    if not groq_api_key:
+    # Called from the script thread, before any loader thread needs the key.
+    if not st.secrets.get("GROQ_API_KEY"):
         st.error("Groq API key not configured. Please add it to your .streamlit/secrets.toml file.")
         st.stop()
 
-    client = Groq(api_key=groq_api_key)
 
-    prompt = f"""
-            Summarize today’s performance of the {index_name} index on NSE using this data. The summary should be below 70 words:
-            {df_summary}
+def market_details_html(text):
+    return f'<div class="market-details"><b>Market Insights (Powered by Groq AI):</b><br>{text}</div>'
 
-            In 4 simple lines, highlight:
-            1) Overall index trend (average % change & volatility).
-            2) Market cap distribution impact.
-            3) Sector performance if discernible.
-            4) Notable sentiment or market observations.
-            Keep it concise, neutral, and data-driven. Do not say "Here's your summary" or include any pre-text.
-        """
 
-    try:
-        chat_completion = client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model="llama-3.1-8b-instant",
-        )
-        return chat_completion.choices[0].message.content
-    except Exception as e:
-        return f"Error generating AI insights: {str(e)}"
+def stream_market_details(jobs):
+    """
+    Streams AI summaries into their placeholders as tokens arrive, all indices at once.
+    jobs: list of (placeholder, index_name, MarketAggregates). Called last, so the rest of the page is already on screen.
+    """
+    api_key = st.secrets.get("GROQ_API_KEY")
+    chunks = queue.Queue()
 
-
-# ---------------------- NEW: TOTAL MARKET INSIGHTS ----------------------
-@st.cache_data(ttl=300)
-def get_total_market_insights(df):
-    insights = {}
-
-    insights['Total Market Cap (Cr)'] = df['ffmc'].sum()
-    insights['Number of Stocks'] = len(df)
-    insights['Volatility (Std Dev of pChange)'] = round(df['pChange'].std(), 2)
-    advances = len(df[df['pChange'] > 0])
-    declines = len(df[df['pChange'] < 0])
-
-    if 'yf_symbol' in df.columns:
-        symbols = df['yf_symbol']
-    else:
-        symbols = df['symbol'].apply(lambda x: str(x) + '.NS')
-
-    pe_ratios = []
-    pb_ratios = []
-    div_yields = []
-    betas = []
-    for symbol in symbols:
+    def pump(i, index_name, agg):
+        # Worker threads only produce text; placeholders are updated from the script thread below
         try:
-            info = yf.Ticker(symbol).info
-            pe = info.get('trailingPE')
-            pb = info.get('priceToBook')
-            div_yld = info.get('dividendYield')
-            beta = info.get('beta')
-            if pe: pe_ratios.append(pe)
-            if pb: pb_ratios.append(pb)
-            if div_yld: div_yields.append(div_yld * 100)  # Convert to %
-            if beta: betas.append(beta)
-        except Exception:
+            for chunk in stream_summary(index_name, market_features(agg), api_key):
+                chunks.put((i, chunk))
+        except Exception as e:  # stream_summary reports LLM failures itself; this covers the feature/cache steps
+            chunks.put((i, f"{ERROR_PREFIX}: {e}"))
+        finally:
+            chunks.put((i, None))  # always, or the script thread would wait for this index forever
+
+    for i, (_, index_name, agg) in enumerate(jobs):
+        threading.Thread(target=pump, args=(i, index_name, agg), daemon=True).start()
+
+    texts = [""] * len(jobs)
+    remaining = len(jobs)
+    while remaining:
+        i, chunk = chunks.get()
+        if chunk is None:
+            remaining -= 1
             continue
+        texts[i] += chunk
+        jobs[i][0].markdown(market_details_html(texts[i]), unsafe_allow_html=True)
 
-    insights['Average P/E'] = round(sum(pe_ratios) / len(pe_ratios), 2) if pe_ratios else 'N/A'
-    insights['Average Dividend Yield (%)'] = round(sum(div_yields) / len(div_yields), 2) if div_yields else 'N/A'
-
-    top_gainers = df.nlargest(5, 'pChange')[['symbol', 'pChange']]
-    top_losers = df.nsmallest(5, 'pChange')[['symbol', 'pChange']]
-
-    return insights, top_gainers, top_losers
 
+# ---------------------- NEW: TOTAL MARKET INSIGHTS ----------------------
+def _fmt(value, spec=',.2f'):
+    return 'N/A' if value != value else format(value, spec)  # NaN -> N/A
 
-# ---------------------- CONFIG ----------------------
-index_list = ['NIFTY TOTAL MARKET', 'NIFTY 50', 'NIFTY NEXT 50', 'NIFTY MIDCAP 50', 'NIFTY MIDCAP 100',
-              'NIFTY MIDCAP 150',
-              'NIFTY SMALLCAP 50', 'NIFTY SMALLCAP 100', 'NIFTY SMALLCAP 250', 'NIFTY MIDSMALLCAP 400',
-              'NIFTY 100', 'NIFTY 200', 'NIFTY AUTO', 'NIFTY BANK', 'NIFTY ENERGY',
-              'NIFTY FINANCIAL SERVICES', 'NIFTY FINANCIAL SERVICES 25/50', 'NIFTY FMCG', 'NIFTY IT',
-              'NIFTY MEDIA', 'NIFTY METAL', 'NIFTY PHARMA', 'NIFTY PSU BANK', 'NIFTY REALTY',
-              'NIFTY PRIVATE BANK', 'NIFTY DIVIDEND OPPORTUNITIES 50', 'NIFTY50 VALUE 20',
-              'NIFTY100 QUALITY 30', 'NIFTY50 EQUAL WEIGHT', 'NIFTY100 EQUAL WEIGHT',
-              'NIFTY100 LOW VOLATILITY 30', 'NIFTY ALPHA 50', 'NIFTY200 QUALITY 30',
-              'NIFTY ALPHA LOW-VOLATILITY 30', 'NIFTY200 MOMENTUM 30', 'NIFTY COMMODITIES',
-              'NIFTY INDIA CONSUMPTION', 'NIFTY CPSE', 'NIFTY INFRASTRUCTURE', 'NIFTY MNC',
-              'NIFTY GROWTH SECTORS 15', 'NIFTY PSE', 'NIFTY SERVICES SECTOR', 'NIFTY100 LIQUID 15',
-              'NIFTY MIDCAP LIQUID 15']
 
-st.set_page_config(page_title='NSE Indices Heatmap Dashboard', layout="wide")
-st_autorefresh(interval=300000, key="auto_refresh")
+# Not cached while Yahoo's circuit is open: ratios from the stored fundamentals are shown, not kept for 5 minutes
+@cache_data(ttl=300, keep=lambda _: get_breaker('yahoo').closed)
+def get_total_market_insights(df):
+    if 'yf_symbol' not in df.columns:
+        df = df.assign(yf_symbol=df['symbol'].astype(str) + '.NS')
+
+    # Store-backed concurrent fetch; symbols that fail after retries are simply left out of the ratios
+    fundamentals = get_fundamentals(df['yf_symbol'].tolist(), VALUATION_FIELDS)
+    agg = compute_aggregates(df, valuation_frame(fundamentals))
+    pe = agg.valuations.get('trailingPE', Valuation())
+    div_yld = agg.valuations.get('dividendYield', Valuation())
+
+    # All values as text so the table has a single column type
+    insights = {
+        'Total Market Cap (Cr)': _fmt(agg.total_cap, ',.0f'),
+        'Number of Stocks': str(agg.stocks),
+        'Advances / Declines / Unchanged': f"{agg.advances} / {agg.declines} / {agg.unchanged}",
+        'Cap-Weighted Return (%)': _fmt(agg.cap_weighted_return),
+        'Equal-Weighted Return (%)': _fmt(agg.equal_weighted_return),
+        'Volatility (Std Dev of pChange)': _fmt(agg.dispersion),
+        'Average P/E': _fmt(pe.mean),
+        'Median P/E': _fmt(pe.median),
+        'Cap-Weighted P/E': _fmt(pe.cap_weighted),
+        'Average Dividend Yield (%)': _fmt(div_yld.mean),
+        'Cap-Weighted Dividend Yield (%)': _fmt(div_yld.cap_weighted),
+        'Fundamentals Coverage': f"{len(fundamentals.data)}/{fundamentals.requested}",
+    }
+    return insights, agg.top_gainers, agg.top_losers
 
 
-# ---------------------- TREEMAP FUNCTION ----------------------
-def build_treemap(df, slice_factor, color_scale, height=900):
-    """Reusable treemap for both single and multi index modes"""
-    fig = px.treemap(
-        df,
-        path=['sector', 'symbol'],  # Nested hierarchy
-        values=slice_factor,  # Box size
-        color='pChange',  # Box color
-        color_continuous_scale=color_scale,
-        custom_data=['pChange', 'ffmc', 'sector']
-    )
-
-    fig.update_layout(
-        margin=dict(t=30, l=0, r=0, b=0),
-        height=height,
-        paper_bgcolor="rgba(0, 0, 0, 0)",
-        plot_bgcolor="rgba(0, 0, 0, 0)",
-    )
-
-    fig.update_traces(
-        hovertemplate=(
-            '<b>%{label}</b><br>'
-            'Sector: %{customdata[2]}<br>'
-            'Size: %{value}<br>'
-            'Market Cap: %{customdata[1]:,.0f} Cr<br>'
-            'pChange: %{customdata[0]:.2f}%'
-        ),
-        texttemplate='%{label}<br>%{customdata[0]:.2f}%',
-        textposition='middle center',
-        textinfo="label+text",
-        marker=dict(cornerradius=8, line=dict(width=2, color='#ffffff'))  # Enhanced borders and rounding
-    )
-
-    fig.update_coloraxes(showscale=False)
-    return fig
-
-
-# ---------------------- PIE CHART FUNCTION ----------------------
-def build_pie_chart(df):
-    advances = df[df['pChange'] > 0].shape[0]
-    declines = df[df['pChange'] < 0].shape[0]
-    no_change = df[df['pChange'] == 0].shape[0]
-
-    fig = px.pie(
-        names=['Advances', 'Declines', 'No Change'],
-        values=[advances, declines, no_change],
-        color=['Advances', 'Declines', 'No Change'],
-        color_discrete_sequence=['#3AA864', '#F38039', '#F2F2F2']
-    )
-    fig.update_traces(hole=0.7, textinfo='none', marker=dict(line=dict(color='#ffffff', width=2)))
-    fig.update_layout(
-        width=150, height=150, showlegend=False,
-        annotations=[dict(
-            text=f'Positive: {advances}<br>Negative: {declines}<br>',
-            x=0.5, y=0.5, font_size=12, showarrow=False, font_color='#333333'
-        )],
-        margin=dict(l=0, r=0, t=0, b=0),
-        paper_bgcolor="rgba(0,0,0,0)"
-    )
-    return fig
+# ---------------------- HISTORICAL RETURNS ----------------------
+def attach_returns(df, period):
+    """df plus a `period` (1W/1M/YTD) return column in %, and that column's name; falls back to 'pChange'"""
+    latest = dict(zip(df['yf_symbol'], df['lastPrice'])) if 'lastPrice' in df.columns else None
+    try:
+        returns = get_returns(df['yf_symbol'].tolist(), latest=latest)
+    except Exception as e:
+        st.warning(f"⚠ Price history unavailable ({e}); coloring by today's change instead.")
+        return df, 'pChange'
+    # yf_symbol is categorical, whose map() would return a categorical of floats
+    return df.assign(**{period: df['yf_symbol'].astype(str).map(returns[period])}), period
+
+
+# ---------------------- SECTOR ROLLUP ----------------------
+def sector_rollup(agg, df, color_by):
+    """Per-sector frame for the rollup treemap, colored by the cap-weighted `color_by` column"""
+    if color_by == 'pChange':
+        return agg.sectors
+    # Coloring by a period return: breadth in the rollup then counts stocks up/down over that period
+    return compute_aggregates(df.assign(pChange=df[color_by])).sectors
+
+
+def select_drill(agg, detail, key=None):
+    """The 'Drill into Sector' choice in Sectors detail ('All Sectors' keeps the rollup), None in Stocks detail"""
+    if detail != "Sectors":
+        return None
+    return st.selectbox("🔎 Drill into Sector", ["All Sectors", *agg.sectors.index], key=key,
+                        help="Show the stocks of one sector; the rollup sends no stocks to the browser.")
+
+
+def detail_treemap(key, df, agg, drill, slice_factor, color_scale, color_by='pChange', height=625):
+    """Rollup while `drill` is 'All Sectors', else the stocks (of the drilled-into sector); cached per key and drill"""
+    key = (*key, color_by, drill, height)
+    if drill == "All Sectors":
+        return cached_sector_treemap(key, sector_rollup(agg, df, color_by), color_scale, height=height,
+                                     color_label=color_by)
+    shown = df if drill is None else df[df['sector'] == drill]
+    return cached_treemap(key, shown, slice_factor, color_scale, height=height, color_by=color_by)
+
+
+# ---------------------- MULTI INDEX LOADER ----------------------
+def with_script_ctx(fn):
+    """Wraps fn so a worker thread runs it with this session's ScriptRunContext (needed by st.cache_data) and trace"""
+    ctx = get_script_run_ctx()
+    run_trace = current_trace()
+
+    def run(*args, **kwargs):
+        add_script_run_ctx(threading.current_thread(), ctx)
+        with use_trace(run_trace):
+            return fn(*args, **kwargs)
+
+    return run
+
+
+def load_index_bundle(idx, slice_by):
+    """Everything one comparison column needs; runs on a loader thread, so no widgets in here"""
+    with span('page.fetch'):
+        df, slice_factor, color_scale, fetched_at = get_index_details(idx, slice_by)
+    if fetched_at is None:  # no snapshot; an empty frame with one only means the slice matched nothing
+        return None, None, None, None
+    return df, slice_factor, color_scale, fetched_at
+
+
+# ---------------------- DEBUG PANEL ----------------------
+def render_debug_panel(trace):
+    """This rerun's stage breakdown, plus process-wide cache hit/miss counters and client stats"""
+    with st.expander("🛠 Debug: where this rerun's time went", expanded=True):
+        st.caption(f"Script run: {1000 * trace.elapsed():,.0f} ms. Stages nest (page.* includes the stages below it), "
+                   f"so durations do not add up.")
+        spans = pd.DataFrame(trace.spans, columns=['Stage', 'Start (ms)', 'Duration (ms)', 'Thread'])
+        spans[['Start (ms)', 'Duration (ms)']] = (spans[['Start (ms)', 'Duration (ms)']] * 1000).round(1)
+        by_stage = spans.groupby('Stage')['Duration (ms)'].agg(['count', 'sum', 'max'])
+        col_a, col_b = st.columns(2)
+        with col_a:
+            st.markdown("*Per stage*")
+            st.dataframe(by_stage.sort_values('sum', ascending=False), use_container_width=True)
+        with col_b:
+            st.markdown("*Timeline*")
+            st.dataframe(spans.sort_values('Start (ms)'), hide_index=True, use_container_width=True)
+        snapshot = registry.snapshot()
+        st.markdown("*Caches (since start-up)*")
+        st.dataframe(pd.DataFrame.from_dict(snapshot['caches'], orient='index'), use_container_width=True)
+        st.markdown("*Clients*")
+        st.json({k: v for k, v in snapshot.items() if k not in ('stages', 'caches')}, expanded=False)
 
 
 # ---------------------- UI ----------------------
 st.title("📊 NSE Indices Heatmap Dashboard")
 
-# Display current date and time with style
-st.markdown(
-    f"<div style='text-align: center; color: #007BFF; font-weight: bold; margin-bottom: 20px;'>Last Updated: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')} IST</div>",
-    unsafe_allow_html=True)
+# Display the data's snapshot time with style; filled in once the snapshot is known
+last_updated = st.empty()
+
+
+def show_last_updated(fetched_at, live=True):
+    stamp = fetched_at.strftime('%Y-%m-%d %H:%M:%S') if fetched_at else "unavailable"
+    stale = ""
+    age = (datetime.datetime.now() - fetched_at).total_seconds() if fetched_at else 0
+    if live and age > STALE_AFTER:
+        # Served while the poller retries in the background; say how old it is and why
+        error = get_poller().last_error(UNIVERSE)
+        reason = f" NSE: {html.escape(error)}" if error else ""
+        old = f"{age:.0f} s" if age < 120 else f"{age / 60:,.0f} min"
+        stale = (f"<br><span style='color: #d9822b;'>⚠ Showing the last good data, {old} old; "
+                 f"refreshing in the background.{reason}</span>")
+    last_updated.markdown(
+        f"<div style='text-align: center; color: #007BFF; font-weight: bold; margin-bottom: 20px;'>Last Updated: {stamp} IST{stale}</div>",
+        unsafe_allow_html=True)
+
 
 # Global filters in an expander at the top
 with st.expander("⚙ Settings", expanded=True):
     col1, col2 = st.columns(2)
     with col1:
-        mode = st.radio("View Mode", ["Single Index", "Multi Index Comparison"], horizontal=True,
-                        help="Choose between detailed single index view or side-by-side comparisons.")
+        mode = st.radio("View Mode", ["Single Index", "Multi Index Comparison", "Intraday Replay"], horizontal=True,
+                        help="Choose between detailed single index view, side-by-side comparisons or a replay of today's session.")
+        debug = st.toggle("🛠 Debug panel", value=DEBUG_PANEL,
+                          help="Show this rerun's stage timings and the cache hit/miss counters.")
     with col2:
         slice_by = st.selectbox("Slice By", ["Market Cap", "Gainers", "Losers"], index=0,
                                 help="Determine how treemap boxes are sized and filtered.")
+        detail = st.radio("Treemap Detail", ["Stocks", "Sectors"], horizontal=True,
+                          help="Sectors shows one box per sector; drill into a sector to see its stocks.")
 
     st.caption("Auto-refreshes every 5 minutes for live data. 💹")
 
 # ---------------------- SINGLE INDEX MODE ----------------------
 if mode == "Single Index":
     with st.expander("Single Index Filters", expanded=True):
-        col1, col2, col3 = st.columns(3)
+        col1, col2, col3, col4 = st.columns(4)
         with col1:
             index_filter = st.selectbox("Choose Index", index_list, index=0, help="Select an NSE index to visualize.")
         with col2:
@@ -376,154 +271,186 @@ if mode == "Single Index":
                 "pChange (High to Low)", "pChange (Low to High)",
                 "ffmc (High to Low)", "ffmc (Low to High)"
             ], help="Sort the data before rendering the treemap.")
+        with col4:
+            color_period = st.selectbox("Color By", ["Today", "1W", "1M", "YTD"],
+                                        help="Color tiles by today's change or by the return over a longer period.")
 
     # Fetch and process data with spinner
     with st.spinner("Fetching latest index data... 🌟"):
-        df = get_index_details(index_filter)
+        # Slice, search and sort are index lookups into the snapshot's precomputed view
+        with span('page.fetch'):
+            df, slice_factor, color_scale, fetched_at = get_index_details(index_filter, slice_by, sort_by, search_query)
+    show_last_updated(fetched_at)
 
-    if not df.empty:
-        # Load or fetch sector data
-        if os.path.exists("sector_map.csv"):
-            sector_map = pd.read_csv("sector_map.csv", index_col=0).to_dict()["sector"]
-        else:
-            with st.spinner("Gathering sector insights... 📈"):
-                sector_map = get_sector_data_yfinance(df['yf_symbol'].tolist())
-            pd.DataFrame.from_dict(sector_map, orient="index", columns=["sector"]).to_csv("sector_map.csv")
-
-        df['sector'] = df['yf_symbol'].map(sector_map)
-        df.dropna(subset=['sector'], inplace=True)
-        df.drop('yf_symbol', axis=1, inplace=True)
-
-        # Filter by search query if provided
-        if search_query:
-            df = df[df['symbol'].str.contains(search_query.upper())]
-
-        # Slice logic
-        if slice_by == 'Market Cap':
-            slice_factor = 'ffmc'
-            color_scale = px.colors.diverging.RdYlGn
-        elif slice_by == 'Gainers':
-            df = df[df["pChange"] > 0].copy()
-            slice_factor = 'pChange'
-            color_scale = ['white', '#a5eb79']
-        elif slice_by == 'Losers':
-            df = df[df["pChange"] < 0].copy()
-            df['Abs'] = df['pChange'].abs()
-            slice_factor = 'Abs'
-            color_scale = ['#ff7a3a', 'white']
-
-        # Sorting
-        if sort_by == "pChange (High to Low)":
-            df = df.sort_values(by="pChange", ascending=False)
-        elif sort_by == "pChange (Low to High)":
-            df = df.sort_values(by="pChange", ascending=True)
-        elif sort_by == "ffmc (High to Low)":
-            df = df.sort_values(by="ffmc", ascending=False)
-        elif sort_by == "ffmc (Low to High)":
-            df = df.sort_values(by="ffmc", ascending=True)
+    if fetched_at is not None:
+        color_by = 'pChange'
+        if color_period != "Today" and not df.empty:
+            with st.spinner("Loading price history... 📈"):
+                df, color_by = attach_returns(df, color_period)
+        df = df.drop(columns='yf_symbol')
+
+        agg = compute_aggregates(df)
 
         # Layout with pie chart on the right
         header1, header2 = st.columns([3, 1])
         with header1:
-            fig = build_treemap(df, slice_factor, color_scale, height=625)
+            drill = select_drill(agg, detail)
+            # Built once per snapshot, slice, search and drill-down; other reruns reuse the cached figure
+            fig = detail_treemap((index_filter, fetched_at, slice_by, search_query), df, agg, drill,
+                                 slice_factor, color_scale, color_by)
             st.plotly_chart(fig, use_container_width=True)
         with header2:
             st.subheader("Advance/Decline Ratio :")
-            pie_fig = build_pie_chart(df)
+            pie_fig = build_pie_chart(agg)
             st.plotly_chart(pie_fig, use_container_width=True)
 
-            df_summary = df.describe().to_string()  # Simple summary of DataFrame stats
-            market_details = get_market_details_groq(index_filter, df_summary)
-            st.markdown(
-                f'<div class="market-details"><b>Market Insights (Powered by Groq AI):</b><br>{market_details}</div>',
-                unsafe_allow_html=True)
-
-        # New: Total Market Insights (if selected) - Moved below both columns
-        if index_filter == 'NIFTY TOTAL MARKET':
-            st.subheader("Total Market Overview ")
-            with st.spinner("Computing total market insights... 📊"):
-                insights, top_gainers, top_losers = get_total_market_insights(df)
-
-            # Display key aggregates in a table
-            st.markdown("*Key Aggregates*")
-            aggregate_df = pd.DataFrame(list(insights.items()), columns=['Metric', 'Value'])
-            st.table(aggregate_df)
-
-            # Top Gainers/Losers Tables
-            col_g, col_l = st.columns(2)
-            with col_g:
-                st.markdown("*Top 5 Gainers*")
-                st.dataframe(top_gainers)
-            with col_l:
-                st.markdown("*Top 5 Losers*")
-                st.dataframe(top_losers)
+            require_groq_api_key()
+            # Filled in by stream_market_details once the rest of the page is on screen
+            insight_placeholder = st.empty()
+            insight_placeholder.markdown(market_details_html("Generating insights... ✨"), unsafe_allow_html=True)
+
+        # New: Total Market Insights (if selected) - Moved below both columns.
+        # Its fundamentals may come from Yahoo, so the slot is reserved now and filled once the rest is on screen
+        overview = st.container() if index_filter == 'NIFTY TOTAL MARKET' else None
 
         # Expander for data table and download
-        with st.expander("📋 View Raw Data", expanded=False):
+        with st.expander("📋 View Raw Data", expanded=False), span('page.raw_data'):
             st.dataframe(df.style.background_gradient(cmap='viridis', subset=['pChange']), use_container_width=True)
             st.download_button("📥 Download as CSV", df.to_csv(index=False), "index_data.csv", "text/csv",
                                help="Download the filtered data as a CSV file.")
+
+        if overview is not None:
+            with overview, span('page.overview'):
+                st.subheader("Total Market Overview ")
+                with st.spinner("Computing total market insights... 📊"):
+                    insights, top_gainers, top_losers = get_total_market_insights(df)
+
+                # Display key aggregates in a table
+                st.markdown("*Key Aggregates*")
+                aggregate_df = pd.DataFrame(list(insights.items()), columns=['Metric', 'Value'])
+                st.table(aggregate_df)
+
+                # Top Gainers/Losers Tables
+                col_g, col_l = st.columns(2)
+                with col_g:
+                    st.markdown("*Top 5 Gainers*")
+                    st.dataframe(top_gainers)
+                with col_l:
+                    st.markdown("*Top 5 Losers*")
+                    st.dataframe(top_losers)
+
+        with span('page.summaries'):
+            stream_market_details([(insight_placeholder, index_filter, agg)])
     else:
-        st.error("⚠ Failed to fetch data for the selected index. Please try another or check your connection.")
+        error = get_poller().last_error(index_filter)
+        st.error("⚠ Failed to fetch data for the selected index. Please try another or check your connection."
+                 + (f"\n\n{error}" if error else ""))
 
 # ---------------------- MULTI INDEX MODE ----------------------
-else:
+elif mode == "Multi Index Comparison":
     with st.expander("Multi Index Filters", expanded=True):
-        selected_indices = st.multiselect("Select up to 3 Indices", index_list, default=["NIFTY 50", "NIFTY BANK"],
-                                          max_selections=3, help="Choose 1-3 indices for side-by-side comparison.")
+        selected_indices = st.multiselect(f"Select up to {MAX_COMPARE_INDICES} Indices", index_list,
+                                          default=["NIFTY 50", "NIFTY BANK"], max_selections=MAX_COMPARE_INDICES,
+                                          help=f"Choose 1-{MAX_COMPARE_INDICES} indices for side-by-side comparison.")
 
     if selected_indices:
+        require_groq_api_key()
+
+        # One placeholder per column, filled in as soon as that index's data lands
         cols = st.columns(len(selected_indices))
-        for i, idx in enumerate(selected_indices):
-            with cols[i]:
+        placeholders = []
+        for col, idx in zip(cols, selected_indices):
+            with col:
                 st.subheader(idx)
-                with st.spinner(f"Fetching {idx} data... 🌟"):
-                    df = get_index_details(idx)
-
-                if not df.empty:
-                    # --- CORRECTED: Using the more reliable yfinance function ---
-                    with st.spinner(f"Gathering sector insights for {idx}... 📈"):
-                        # This ensures consistency with the single-index mode's fallback
-                        sector_map = get_sector_data_yfinance(df['yf_symbol'].tolist())
-
-                    df['sector'] = df['yf_symbol'].map(sector_map).fillna("Unknown")
-                    # --- END OF CORRECTION ---
-
-                    # Determine slice factor and color scale
-                    if slice_by == 'Market Cap':
-                        slice_factor = 'ffmc'
-                        color_scale = px.colors.diverging.RdYlGn
-                    elif slice_by == 'Gainers':
-                        df = df[df["pChange"] > 0].copy()
-                        slice_factor = 'pChange'
-                        color_scale = ['white', '#a5eb79']
-                    elif slice_by == 'Losers':
-                        df = df[df["pChange"] < 0].copy()
-                        df['Abs'] = df['pChange'].abs()
-                        slice_factor = 'Abs'
-                        color_scale = ['#ff7a3a', 'white']
-
+                placeholder = st.empty()
+                placeholder.info(f"Fetching {idx} data... 🌟")
+                placeholders.append(placeholder)
+
+        # All indices load concurrently; rendering stays on the script thread
+        snapshot_times = []
+        summary_jobs = []
+        with ThreadPoolExecutor(max_workers=len(selected_indices), thread_name_prefix='index-loader') as pool:
+            futures = {pool.submit(with_script_ctx(load_index_bundle), idx, slice_by): i
+                       for i, idx in enumerate(selected_indices)}
+            for future in as_completed(futures):
+                i = futures[future]
+                idx = selected_indices[i]
+                df, slice_factor, color_scale, fetched_at = future.result()
+                if fetched_at:
+                    snapshot_times.append(fetched_at)
+
+                with placeholders[i].container():
+                    if df is None:
+                        st.error(f"⚠ No data for {idx}. Try another index.")
                     # Ensure dataframe is not empty after filtering
-                    if not df.empty:
-                        fig = build_treemap(df, slice_factor, color_scale, height=625)
-                        st.plotly_chart(fig, use_container_width=True)
+                    elif not df.empty:
+                        agg = compute_aggregates(df)
+                        drill = select_drill(agg, detail, key=f"drill_{idx}")
+                        # Built once per snapshot, slice and drill-down; other reruns reuse the cached figure
+                        fig = detail_treemap((idx, fetched_at, slice_by, ""), df, agg, drill, slice_factor,
+                                             color_scale)
+                        st.plotly_chart(fig, use_container_width=True, key=f"treemap_{idx}")
 
                         # Add pie chart below each treemap
-                        pie_fig = build_pie_chart(df)
-                        st.plotly_chart(pie_fig, use_container_width=True)
-
-                        # Get market details from Groq AI
-                        df_summary = df.describe().to_string()
-                        market_details = get_market_details_groq(idx, df_summary)
-                        st.markdown(
-                            f'<div class="market-details"><b>Market Insights (Powered by Groq AI):</b><br>{market_details}</div>',
-                            unsafe_allow_html=True)
+                        pie_fig = build_pie_chart(agg)
+                        st.plotly_chart(pie_fig, use_container_width=True, key=f"pie_{idx}")
+
+                        # Filled in by stream_market_details once every column is on screen
+                        insight_placeholder = st.empty()
+                        insight_placeholder.markdown(market_details_html("Generating insights... ✨"),
+                                                     unsafe_allow_html=True)
+                        summary_jobs.append((insight_placeholder, idx, agg))
                     else:
                         st.warning(f"No data to display for '{slice_by}' in {idx}.")
-                else:
-                    st.error(f"⚠ No data for {idx}. Try another index.")
+
+        # The oldest of the snapshots on screen
+        show_last_updated(min(snapshot_times) if snapshot_times else None)
+
+        with span('page.summaries'):
+            stream_market_details(summary_jobs)
     else:
         st.info("Please select at least one index to compare. ✨")
 
+# ---------------------- INTRADAY REPLAY MODE ----------------------
+else:
+    # Reads only the local history written by the poller; scrubbing never touches the network
+    history = get_poller().history
+    days = history.days() if history is not None else []
+    if days:
+        with st.expander("Replay Filters", expanded=True):
+            col1, col2 = st.columns(2)
+            with col1:
+                replay_index = st.selectbox("Choose Index", index_list, index=0, key="replay_index",
+                                            help="Select an NSE index to replay.")
+            with col2:
+                replay_day = st.selectbox("Trading Day", days, format_func=lambda d: d.strftime('%d %b %Y'))
+            times = history.times(replay_day)
+            replay_at = st.select_slider("Time", options=times, value=times[-1],
+                                         format_func=lambda t: t.strftime('%H:%M:%S'),
+                                         help="Scrub through the day's refreshes.")
+
+        with span('page.fetch'):
+            snapshot = get_poller().replay(replay_index, replay_at)
+        show_last_updated(replay_at, live=False)
+        if snapshot is None:
+            st.warning(f"No recorded data for {replay_index} at this time.")
+        else:
+            df, slice_factor, color_scale = snapshot.view.select(slice_by)
+            agg = compute_aggregates(df)
+            header1, header2 = st.columns([3, 1])
+            with header1:
+                drill = select_drill(agg, detail, key="replay_drill")
+                fig = detail_treemap(('replay', replay_index, replay_at, slice_by), df, agg, drill, slice_factor,
+                                     color_scale)
+                st.plotly_chart(fig, use_container_width=True)
+            with header2:
+                st.subheader("Advance/Decline Ratio :")
+                st.plotly_chart(build_pie_chart(agg), use_container_width=True)
+    else:
+        st.info("No intraday history recorded yet; every refresh from now on is saved for replay. 🕒")
+
+if debug:
+    render_debug_panel(trace)
+
 st.markdown("---")
 st.caption("Made with ❤ by M.Chandra Sekhara Sri Sai | Data sourced from NSE India and Yahoo Finance")
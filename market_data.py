@@ -0,0 +1,70 @@
+"""NSE index constituents as DataFrames, independent of Streamlit."""
+import pandas as pd
+
+from nse_client import get_nse_client
+
+INDEX_LIST = ['NIFTY TOTAL MARKET', 'NIFTY 50', 'NIFTY NEXT 50', 'NIFTY MIDCAP 50', 'NIFTY MIDCAP 100',
+              'NIFTY MIDCAP 150',
+              'NIFTY SMALLCAP 50', 'NIFTY SMALLCAP 100', 'NIFTY SMALLCAP 250', 'NIFTY MIDSMALLCAP 400',
+              'NIFTY 100', 'NIFTY 200', 'NIFTY AUTO', 'NIFTY BANK', 'NIFTY ENERGY',
+              'NIFTY FINANCIAL SERVICES', 'NIFTY FINANCIAL SERVICES 25/50', 'NIFTY FMCG', 'NIFTY IT',
+              'NIFTY MEDIA', 'NIFTY METAL', 'NIFTY PHARMA', 'NIFTY PSU BANK', 'NIFTY REALTY',
+              'NIFTY PRIVATE BANK', 'NIFTY DIVIDEND OPPORTUNITIES 50', 'NIFTY50 VALUE 20',
+              'NIFTY100 QUALITY 30', 'NIFTY50 EQUAL WEIGHT', 'NIFTY100 EQUAL WEIGHT',
+              'NIFTY100 LOW VOLATILITY 30', 'NIFTY ALPHA 50', 'NIFTY200 QUALITY 30',
+              'NIFTY ALPHA LOW-VOLATILITY 30', 'NIFTY200 MOMENTUM 30', 'NIFTY COMMODITIES',
+              'NIFTY INDIA CONSUMPTION', 'NIFTY CPSE', 'NIFTY INFRASTRUCTURE', 'NIFTY MNC',
+              'NIFTY GROWTH SECTORS 15', 'NIFTY PSE', 'NIFTY SERVICES SECTOR', 'NIFTY100 LIQUID 15',
+              'NIFTY MIDCAP LIQUID 15']
+
+
+def parse_index_payload(data):
+    """Constituent frame from an equity-stockIndices payload (the first row is the index itself)."""
+    df = pd.DataFrame(data['data'])
+    if not df.empty:
+        if "meta" in df.columns:
+            df = df.drop(["meta"], axis=1)
+        df = df.set_index("symbol", drop=True)
+        df['ffmc'] = round(df['ffmc'] / 10000000, 0)
+        df = df.iloc[1:].reset_index(drop=False)
+        df['yf_symbol'] = df['symbol'] + '.NS'
+    return df
+
+
+SNAPSHOT_COLUMNS = {
+    # column : dtype in the snapshots shared by every session; every other NSE field is dropped
+    'symbol': 'category',
+    'yf_symbol': 'category',
+    'sector': 'category',
+    'open': 'float64',  # prices stay float64: float32 loses paise above about 1 lakh
+    'dayHigh': 'float64',
+    'dayLow': 'float64',
+    'previousClose': 'float64',
+    'lastPrice': 'float64',
+    'change': 'float32',
+    'pChange': 'float32',
+    'yearHigh': 'float64',
+    'yearLow': 'float64',
+    'perChange30d': 'float32',
+    'perChange365d': 'float32',
+    'totalTradedVolume': 'float64',
+    'ffmc': 'float32',  # crores, already rounded to whole numbers
+}
+
+
+def compact_frame(frame):
+    """A new frame with only the SNAPSHOT_COLUMNS present in `frame`, in their compact dtypes."""
+    columns = {}
+    for column, dtype in SNAPSHOT_COLUMNS.items():
+        if column in frame.columns:
+            values = frame[column].reset_index(drop=True)
+            if dtype != 'category':
+                values = pd.to_numeric(values, errors='coerce')
+            columns[column] = values.astype(dtype)
+    return pd.DataFrame(columns)
+
+
+def fetch_index_frame(index_name, client=None):
+    """Fetch one index from NSE; raises NSEError if NSE cannot be reached."""
+    client = client or get_nse_client()
+    return parse_index_payload(client.equity_stock_indices(index_name))
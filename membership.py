@@ -0,0 +1,107 @@
+"""Index-membership index: which symbols make up each NSE index.
+
+Constituents change a few times a year, so the mapping is persisted next to the
+fundamentals store and refreshed only once it is older than MEMBERSHIP_TTL.
+Quotes are then fetched once for NIFTY TOTAL MARKET and every other index is a
+filter over that frame (`derive_frame`).
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+from store import connect, init_schema
+
+log = logging.getLogger(__name__)
+
+UNIVERSE = 'NIFTY TOTAL MARKET'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS index_members (
+    index_name   TEXT NOT NULL,
+    position     INTEGER NOT NULL,
+    symbol       TEXT NOT NULL,
+    refreshed_at REAL NOT NULL,
+    PRIMARY KEY (index_name, position)
+) WITHOUT ROWID
+"""
+
+
+class MembershipIndex:
+    """{ index name : (symbols...) }, cached in memory and persisted in SQLite."""
+
+    def __init__(self, path=None, ttl=None):
+        self.path = path or config.STORE_PATH
+        self.ttl = ttl or config.MEMBERSHIP_TTL
+        init_schema(self.path, _SCHEMA)
+        self._members = {}  # { index name : (tuple of symbols, refreshed_at) }
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        conn = connect(self.path)
+        try:
+            rows = conn.execute("SELECT index_name, symbol, refreshed_at FROM index_members "
+                                "ORDER BY index_name, position").fetchall()
+        finally:
+            conn.close()
+        members = {}
+        for index_name, symbol, refreshed_at in rows:
+            symbols, _ = members.get(index_name, ((), refreshed_at))
+            members[index_name] = (symbols + (symbol,), refreshed_at)
+        with self._lock:
+            self._members = members
+
+    def get(self, index_name):
+        """Constituent symbols, or None if this index has never been seen."""
+        entry = self._members.get(index_name)
+        return entry[0] if entry else None
+
+    def is_stale(self, index_name, now=None):
+        entry = self._members.get(index_name)
+        return entry is None or (now or time.time()) - entry[1] > self.ttl
+
+    def update(self, index_name, symbols):
+        """Replace the constituents of one index atomically."""
+        symbols = tuple(symbols)
+        refreshed_at = time.time()
+        conn = connect(self.path)
+        try:
+            with conn:
+                conn.execute("DELETE FROM index_members WHERE index_name = ?", (index_name,))
+                conn.executemany("INSERT INTO index_members VALUES (?, ?, ?, ?)",
+                                 [(index_name, i, s, refreshed_at) for i, s in enumerate(symbols)])
+        finally:
+            conn.close()
+        with self._lock:
+            self._members[index_name] = (symbols, refreshed_at)
+
+    def refresh(self, index_names, fetch, workers=None):
+        """Re-fetch the stale indices among `index_names` with `fetch(index_name) -> frame`."""
+        stale = [name for name in index_names if self.is_stale(name)]
+
+        def refresh_one(index_name):
+            try:
+                frame = fetch(index_name)
+                if not frame.empty:
+                    self.update(index_name, frame['symbol'])
+            except Exception as e:  # keep the previous membership; retried on the next poll
+                log.warning("Refreshing the members of %s failed: %s", index_name, e)
+
+        if stale:
+            with ThreadPoolExecutor(max_workers=workers or config.POLL_WORKERS,
+                                    thread_name_prefix='membership') as pool:
+                list(pool.map(refresh_one, stale))
+        return stale
+
+
+def derive_frame(universe, members):
+    """
+    Frame of one index from the universe frame indexed by symbol.
+
+    A single vectorised reindex: rows keep the index's own order, and members
+    missing from the universe are dropped.
+    """
+    frame = universe.reindex(members)
+    return frame[frame['pChange'].notna()].reset_index(names='symbol')
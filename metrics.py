@@ -0,0 +1,210 @@
+"""Process-wide tracing spans, stage latencies and cache counters.
+
+`span(stage)` times a block: every span feeds the process-wide stage totals
+and, when a trace is active in the current context (one Streamlit rerun), is
+also recorded on that trace for the debug panel. Cache lookups report hits and
+misses with `cache_hit` / `cache_miss`, and components with their own counters
+(the NSE client, the LLM gateway) register a collector. Everything is exported
+as Prometheus text or JSON by the snapshot API's /metrics endpoints.
+"""
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+_current_trace = contextvars.ContextVar('trace', default=None)
+
+
+class Trace:
+    """Spans recorded during one script run, possibly from several threads."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = []  # [ (stage, start offset s, duration s, thread name) ]
+        self._lock = threading.Lock()
+
+    def add(self, stage, start, duration):
+        with self._lock:
+            self.spans.append((stage, start - self.started, duration, threading.current_thread().name))
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+class Registry:
+    def __init__(self):
+        self._stages = {}  # { stage : [count, total s, max s] }
+        self._caches = {}  # { cache : [hits, misses] }
+        self._collectors = {}  # { component : fn() -> { metric : number } }
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            entry = self._stages.setdefault(stage, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+
+    def cache(self, name, hit, n=1):
+        with self._lock:
+            self._caches.setdefault(name, [0, 0])[0 if hit else 1] += n
+
+    def register_collector(self, component, collect):
+        with self._lock:
+            self._collectors[component] = collect
+
+    def snapshot(self):
+        """{ 'stages': {...}, 'caches': {...}, <component>: {...} } with times in milliseconds."""
+        with self._lock:
+            stages = {k: list(v) for k, v in self._stages.items()}
+            caches = {k: list(v) for k, v in self._caches.items()}
+            collectors = dict(self._collectors)
+        result = {
+            'stages': {stage: {'count': n, 'total_ms': round(1e3 * total, 1), 'avg_ms': round(1e3 * total / n, 1),
+                               'max_ms': round(1e3 * peak, 1)}
+                       for stage, (n, total, peak) in sorted(stages.items())},
+            'caches': {name: {'hits': hits, 'misses': misses,
+                              'hit_ratio': round(hits / (hits + misses), 3) if hits + misses else 0.0}
+                       for name, (hits, misses) in sorted(caches.items())},
+        }
+        for component, collect in sorted(collectors.items()):
+            try:
+                result[component] = collect()
+            except Exception as e:
+                result[component] = {'error': str(e)}
+        return result
+
+    def prometheus(self, prefix='nse_dashboard'):
+        """The registry in Prometheus text exposition format (0.0.4)."""
+        with self._lock:
+            stages = {k: list(v) for k, v in self._stages.items()}
+            caches = {k: list(v) for k, v in self._caches.items()}
+        lines = [f"# HELP {prefix}_stage_seconds Time spent per fetch, transform and render stage.",
+                 f"# TYPE {prefix}_stage_seconds summary"]
+        for stage, (n, total, _) in sorted(stages.items()):
+            lines += [f'{prefix}_stage_seconds_count{{stage="{stage}"}} {n}',
+                      f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {total:.6f}']
+        lines += [f"# HELP {prefix}_stage_seconds_max Slowest observation per stage since start-up.",
+                  f"# TYPE {prefix}_stage_seconds_max gauge"]
+        lines += [f'{prefix}_stage_seconds_max{{stage="{stage}"}} {peak:.6f}'
+                  for stage, (_, _, peak) in sorted(stages.items())]
+        for kind, column in (('hits', 0), ('misses', 1)):
+            lines += [f"# HELP {prefix}_cache_{kind}_total Cache {kind} per cache.",
+                      f"# TYPE {prefix}_cache_{kind}_total counter"]
+            lines += [f'{prefix}_cache_{kind}_total{{cache="{name}"}} {counts[column]}'
+                      for name, counts in sorted(caches.items())]
+        snapshot = self.snapshot()
+        for component in sorted(set(snapshot) - {'stages', 'caches'}):
+            for metric, value in sorted(snapshot[component].items()):
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    name = f"{prefix}_{component}_{metric}"
+                    lines += [f"# TYPE {name} gauge", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+@contextmanager
+def span(stage):
+    """Time the enclosed block as `stage`, process-wide and on the current trace if any."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        registry.observe(stage, duration)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(stage, start, duration)
+
+
+def timed(stage):
+    """Decorator form of `span`."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def cache_hit(name, n=1):
+    registry.cache(name, True, n)
+
+
+def cache_miss(name, n=1):
+    registry.cache(name, False, n)
+
+
+def start_trace():
+    """Begin a trace for the current context (one script run) and return it."""
+    trace = Trace()
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+@contextmanager
+def use_trace(trace):
+    """Record spans of the enclosed block on `trace`, e.g. in a worker thread started by a traced run."""
+    token = _current_trace.set(trace)
+    try:
+        yield
+    finally:
+        _current_trace.reset(token)
+
+
+def register_collector(component, collect):
+    registry.register_collector(component, collect)
+
+
+class _Uncached(Exception):
+    """Carries a result out of st.cache_data without it being cached (exceptions never are)."""
+
+    def __init__(self, result):
+        super().__init__()
+        self.result = result
+
+
+def cache_data(keep=None, **kwargs):
+    """
+    `st.cache_data` that also counts hits and misses under the function's name.
+
+    When `keep(result)` is false the result is returned but not cached, e.g. one
+    computed while an upstream was failing, so it is not served for the whole TTL.
+    """
+    import streamlit as st
+
+    def decorate(fn):
+        missed = threading.local()
+
+        @functools.wraps(fn)
+        def body(*args, **kw):
+            missed.value = True  # the body only runs on a miss
+            result = fn(*args, **kw)
+            if keep is not None and not keep(result):
+                raise _Uncached(result)
+            return result
+
+        cached = st.cache_data(**kwargs)(body)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kw):
+            missed.value = False
+            try:
+                result = cached(*args, **kw)
+            except _Uncached as e:
+                result = e.result
+            registry.cache(fn.__name__, not missed.value)
+            return result
+
+        wrapper.clear = cached.clear
+        return wrapper
+
+    return decorate
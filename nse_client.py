@@ -0,0 +1,160 @@
+"""Long-lived, thread-safe HTTP client for the NSE website API.
+
+NSE only answers API calls that carry the cookies set by one of its HTML pages.
+Instead of a fresh session and warm-up request per fetch, one pooled session is
+shared by the whole process: it warms up once, reuses its cookies until they
+expire, and re-warms only then or when NSE answers 401/403.
+"""
+import threading
+import time
+from urllib.parse import quote
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import config
+from circuit import CircuitOpenError, get_breaker
+from metrics import register_collector, span
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0',
+    "Accept": "application/json,text/html",
+    'Accept-Language': 'en-US,en;q=0.9'
+}
+WARMUP_PATH = "/market-data/live-equity-market"
+
+
+class NSEError(Exception):
+    """NSE could not be reached or returned an unusable response."""
+
+
+class NSEClient:
+    def __init__(self, base_url=None, timeout=None, cookie_ttl=None, pool_size=None):
+        self.base_url = (base_url or config.NSE_BASE_URL).rstrip('/')
+        self.timeout = timeout or config.NSE_TIMEOUT
+        self.cookie_ttl = cookie_ttl or config.NSE_COOKIE_TTL
+        pool_size = pool_size or config.NSE_POOL_SIZE
+
+        self._session = requests.Session()
+        self._session.headers.update(HEADERS)
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+
+        self._breaker = get_breaker('nse')
+        self._warm_lock = threading.Lock()
+        self._expires_at = 0.0
+        self._stats_lock = threading.Lock()
+        self._stats = {'requests': 0, 'failures': 0, 'warmups': 0, 'auth_rewarms': 0,
+                       'latency_total': 0.0, 'latency_last': 0.0, 'latency_max': 0.0}
+
+    # ---------------------- COOKIES ----------------------
+    def _cookie_expiry(self, now):
+        expiries = [c.expires for c in self._session.cookies if c.expires]
+        return min(expiries) if expiries else now + self.cookie_ttl
+
+    def _warm(self, stale=None):
+        """Warm up when cookies expired, or when they are still the `stale` generation NSE rejected."""
+        with self._warm_lock:
+            now = time.time()
+            if stale is None and now < self._expires_at:
+                return  # another thread already warmed up
+            if stale is not None and self._expires_at != stale:
+                return  # another thread already re-warmed after the same rejection
+            try:
+                with span('nse.warmup'):
+                    self._session.get(self.base_url + WARMUP_PATH, timeout=self.timeout)
+            except requests.RequestException as e:
+                self._count('failures')
+                raise NSEError(f"warm-up failed: {e}") from e
+            self._expires_at = self._cookie_expiry(now)  # cookie_ttl only when no cookie carries an expiry
+            self._count('warmups')
+
+    # ---------------------- METRICS ----------------------
+    def _count(self, key, value=1):
+        with self._stats_lock:
+            self._stats[key] += value
+
+    def _record_latency(self, seconds):
+        with self._stats_lock:
+            self._stats['requests'] += 1
+            self._stats['latency_total'] += seconds
+            self._stats['latency_last'] = seconds
+            self._stats['latency_max'] = max(self._stats['latency_max'], seconds)
+
+    def stats(self):
+        """Counters since start-up, with latencies in milliseconds."""
+        with self._stats_lock:
+            s = dict(self._stats)
+        return {
+            'requests': s['requests'],
+            'failures': s['failures'],
+            'warmups': s['warmups'],
+            'auth_rewarms': s['auth_rewarms'],
+            'latency_avg_ms': round(1000 * s['latency_total'] / s['requests'], 1) if s['requests'] else 0.0,
+            'latency_last_ms': round(1000 * s['latency_last'], 1),
+            'latency_max_ms': round(1000 * s['latency_max'], 1),
+        }
+
+    # ---------------------- API ----------------------
+    def get_json(self, path):
+        """GET `path` (relative to the base URL) and decode the JSON body; fails fast while NSE's circuit is open."""
+        try:
+            self._breaker.check()
+        except CircuitOpenError as e:
+            raise NSEError(str(e)) from e
+        try:
+            payload = self._get_json(path)
+        except NSEError as e:
+            self._breaker.failure(e)
+            raise
+        self._breaker.success()
+        return payload
+
+    def _get_json(self, path):
+        if time.time() >= self._expires_at:
+            self._warm()
+        for reauth in (False, True):
+            generation = self._expires_at
+            start = time.perf_counter()
+            try:
+                with span('nse.request'):
+                    resp = self._session.get(self.base_url + path, timeout=self.timeout)
+            except requests.RequestException as e:
+                self._count('failures')
+                raise NSEError(f"{type(e).__name__}: {e}") from e
+            finally:
+                self._record_latency(time.perf_counter() - start)
+
+            if resp.status_code in (401, 403) and not reauth:
+                self._count('auth_rewarms')
+                self._warm(stale=generation)
+                continue
+            if not resp.ok:
+                self._count('failures')
+                raise NSEError(f"HTTP {resp.status_code} for {path}")
+            try:
+                return resp.json()
+            except ValueError as e:
+                self._count('failures')
+                raise NSEError(f"invalid JSON for {path}") from e
+        self._count('failures')
+        raise NSEError(f"not authorised for {path} after re-warming")
+
+    def equity_stock_indices(self, index_name):
+        """Raw `equity-stockIndices` payload for one index."""
+        return self.get_json(f"/api/equity-stockIndices?index={quote(index_name.upper(), safe='/')}")
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_nse_client():
+    """Process-wide NSEClient shared by every session and thread."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = NSEClient()
+            register_collector('nse', _client.stats)
+        return _client
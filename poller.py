@@ -0,0 +1,228 @@
+"""Background market-data poller: one per server process, shared by every session.
+
+Every index is a subset of NIFTY TOTAL MARKET, so each poll fetches quotes for
+that one index only, decorates them with sectors once, and derives every other
+index from it through the membership index. Sessions only ever read the latest
+immutable `Snapshot`, so the number of requests to NSE no longer grows with the
+number of viewers or with the number of indices on screen.
+"""
+import datetime
+import logging
+import threading
+from dataclasses import dataclass
+from functools import cached_property
+
+import pandas as pd
+
+import config
+from history import get_history
+from market_data import INDEX_LIST, compact_frame, fetch_index_frame
+from metrics import cache_hit, cache_miss, span
+from membership import UNIVERSE, MembershipIndex, derive_frame
+from sectors import attach_known_sectors, attach_sectors
+from views import SnapshotView
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    index_name: str
+    frame: pd.DataFrame  # compact, shared by every session: never mutate; derived frames share its buffers
+    fetched_at: datetime.datetime
+
+    @classmethod
+    def build(cls, index_name, frame, fetched_at):
+        """Snapshot of `frame` reduced to the compact SNAPSHOT_COLUMNS schema."""
+        return cls(index_name, compact_frame(frame), fetched_at)
+
+    @cached_property
+    def view(self):
+        """Slice/sort/search lookups over `frame`, built on first use and shared by every session."""
+        return SnapshotView(self.frame)
+
+
+class MarketPoller:
+    def __init__(self, indices=None, fetch=fetch_index_frame, interval=None, membership=None, decorate=attach_sectors,
+                 history=None, decorate_fast=attach_known_sectors):
+        self.indices = list(indices or INDEX_LIST)
+        self.interval = interval or config.POLL_INTERVAL
+        self.membership = membership or MembershipIndex()
+        self._fetch = fetch
+        self._decorate = decorate
+        self._decorate_fast = decorate_fast  # used when a session is waiting: no network beyond NSE itself
+        self.history = history  # HistoryStore recording every universe poll, or None
+        self._universe = None  # Snapshot of NIFTY TOTAL MARKET
+        self._universe_by_symbol = None  # the same frame indexed by symbol, for derive_frame
+        self._derived = {}  # { index name : Snapshot } derived from the current universe
+        self._fallback = {}  # { index name : Snapshot } fetched directly while membership is unknown
+        self._errors = {}  # { index name : last error message }
+        self._replayed = {}  # { (index name, poll time) : Snapshot } rebuilt from history
+        self._lock = threading.Lock()
+        self._cold_start_lock = threading.Lock()
+        self._revalidating = threading.Lock()  # held while an on-read refresh is running
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _fetch_snapshot(self, index_name, fast=False):
+        try:
+            frame = self._fetch(index_name)
+        except Exception as e:
+            self._errors[index_name] = str(e)
+            log.warning("Fetching %s failed: %s", index_name, e)
+            return None
+        if frame.empty:
+            self._errors[index_name] = "empty response"
+            return None
+        decorate = self._decorate_fast if fast else self._decorate
+        try:
+            frame = decorate(frame)
+        except Exception as e:  # e.g. the sector store is locked by another process
+            self._errors[index_name] = f"resolving sectors failed: {e}"
+            log.warning("Resolving sectors of %s failed: %s", index_name, e)
+            return None
+        self._errors.pop(index_name, None)
+        return Snapshot.build(index_name, frame, datetime.datetime.now())
+
+    def _update_membership(self, index_name, symbols):
+        try:
+            self.membership.update(index_name, symbols)
+        except Exception as e:
+            log.warning("Recording the members of %s failed: %s", index_name, e)
+
+    def refresh_universe(self, fast=False):
+        """Fetch NIFTY TOTAL MARKET once; every derived view is rebuilt lazily from it."""
+        with span('poller.universe'):
+            snapshot = self._fetch_snapshot(UNIVERSE, fast)
+        if snapshot is None:
+            return self._universe  # keep serving the previous snapshot
+        by_symbol = snapshot.frame.drop_duplicates('symbol').set_index('symbol')
+        with self._lock:
+            if fast and self._universe is not None:
+                return self._universe  # a full refresh landed first; keep its sectors
+            self._universe, self._universe_by_symbol = snapshot, by_symbol
+            self._derived = {}
+        self._update_membership(UNIVERSE, snapshot.frame['symbol'])
+        if self.history is not None and not fast:  # the next full poll records it, sectors included
+            try:
+                self.history.append(snapshot.frame, snapshot.fetched_at)
+            except Exception as e:
+                log.warning("Recording history failed: %s", e)
+        return snapshot
+
+    def poll_once(self):
+        self.refresh_universe()
+        self.membership.refresh(self.indices, self._fetch)  # a no-op until memberships expire
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception:  # never let one bad poll end the thread; the next one retries
+                log.exception("Market poll failed")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='market-poller', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _revalidate(self):
+        """Refresh the universe on a background thread, unless one such refresh is already running."""
+        if not self._revalidating.acquire(blocking=False):
+            return
+
+        def run():
+            try:
+                self.refresh_universe()
+            finally:
+                self._revalidating.release()
+
+        threading.Thread(target=run, name='market-revalidate', daemon=True).start()
+
+    def get(self, index_name):
+        """
+        Latest snapshot of one index, built in memory from the universe whenever possible.
+
+        Stale-while-revalidate: a snapshot older than STALE_AFTER (a poll failed, or
+        NSE's circuit is open) is still returned at once, and a background refresh
+        is started; a failed refresh never replaces it.
+        """
+        if self._universe is None:
+            # Cold start: fetch the universe inline, once, for whichever session asks first, with the sectors
+            # already stored; the background poll resolves the rest and replaces it
+            with self._cold_start_lock:
+                if self._universe is None:
+                    self.refresh_universe(fast=True)
+        with self._lock:
+            universe, by_symbol = self._universe, self._universe_by_symbol
+            if universe is None:
+                return None
+            if (datetime.datetime.now() - universe.fetched_at).total_seconds() > config.STALE_AFTER:
+                self._revalidate()
+            if index_name == UNIVERSE:
+                return universe
+            if index_name in self._derived:
+                cache_hit('derived_snapshots')
+                return self._derived[index_name]
+        cache_miss('derived_snapshots')
+
+        members = self.membership.get(index_name)
+        if members is None:
+            # Membership unknown yet: fetch this index directly, which also records its members
+            fallback = self._fallback.get(index_name)
+            if fallback is None or fallback.fetched_at < universe.fetched_at:
+                fallback = self._fetch_snapshot(index_name, fast=True) or fallback
+                if fallback is not None:
+                    self._fallback[index_name] = fallback
+                    self._update_membership(index_name, fallback.frame['symbol'])
+            return fallback
+
+        with span('transform.derive'):
+            snapshot = Snapshot.build(index_name, derive_frame(by_symbol, members), universe.fetched_at)
+        with self._lock:
+            if self._universe is universe:
+                self._derived[index_name] = snapshot
+        return snapshot
+
+    def replay(self, index_name, at):
+        """Snapshot of one index as of the recorded poll at `at`, from local history only; None if unknown."""
+        key = (index_name, at)
+        if key in self._replayed:
+            return self._replayed[key]
+        history = self.history.load(at.date()) if self.history is not None else None
+        if history is None:
+            return None
+        frame = history.frame_at(at)
+        if index_name != UNIVERSE:
+            members = self.membership.get(index_name)
+            if members is None:
+                return None
+            frame = derive_frame(frame.set_index('symbol'), members)
+        snapshot = Snapshot.build(index_name, frame, at)
+        with self._lock:
+            self._replayed[key] = snapshot
+            while len(self._replayed) > 256:
+                self._replayed.pop(next(iter(self._replayed)))
+        return snapshot
+
+    def last_error(self, index_name):
+        """Why the latest refresh of `index_name` (or of the universe it is derived from) failed, if it did."""
+        return self._errors.get(index_name) or self._errors.get(UNIVERSE)
+
+
+_poller = None
+_poller_lock = threading.Lock()
+
+
+def get_poller():
+    """The process-wide poller, started on first use."""
+    global _poller
+    with _poller_lock:
+        if _poller is None:
+            _poller = MarketPoller(history=get_history()).start()
+        return _poller
@@ -0,0 +1,249 @@
+"""Historical daily OHLCV keyed by yf_symbol, downloaded in bulk and cached locally.
+
+Bars live in Parquet parts under PRICES_DIR and the date range already fetched
+for each symbol is kept in the SQLite store. A request downloads only the dates
+outside that range, and symbols that need the same range share one bulk
+download. `period_returns` then computes 1W/1M/YTD returns for every symbol at
+once from a dates x symbols close matrix.
+
+The downloader is injectable (`download(symbols, start, end) -> long frame`), so
+everything here runs offline against recorded or synthetic bars.
+"""
+import datetime
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import config
+from metrics import span
+from store import connect, init_schema
+
+log = logging.getLogger(__name__)
+
+BAR_COLUMNS = ['open', 'high', 'low', 'close', 'adj_close', 'volume']
+PERIODS = {
+    # period : offset back from the last close; YTD is measured from the previous year's last close
+    '1W': pd.DateOffset(weeks=1),
+    '1M': pd.DateOffset(months=1),
+    'YTD': None,
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS price_coverage (
+    symbol       TEXT PRIMARY KEY,
+    start        TEXT NOT NULL,
+    end          TEXT NOT NULL,
+    refreshed_at REAL NOT NULL
+) WITHOUT ROWID
+"""
+_DAY = datetime.timedelta(days=1)
+
+
+def _empty_bars():
+    return pd.DataFrame({'date': pd.Series(dtype='datetime64[ns]'), 'symbol': pd.Series(dtype=object),
+                         **{column: pd.Series(dtype='float64') for column in BAR_COLUMNS}})
+
+
+def yf_download(symbols, start, end):
+    """Long frame of daily bars (date, symbol, BAR_COLUMNS) for `symbols` over [start, end], in one bulk call."""
+    import yfinance as yf
+    raw = yf.download(list(symbols), start=start.isoformat(), end=(end + _DAY).isoformat(), interval='1d',
+                      group_by='column', auto_adjust=False, actions=False, threads=True, progress=False)
+    if raw is None or raw.empty:
+        return _empty_bars()
+    bars = raw.stack(level=1, future_stack=True)
+    bars.index.names = ['date', 'symbol']
+    bars = bars.rename(columns=lambda c: str(c).lower().replace(' ', '_')).reset_index()
+    bars['date'] = pd.to_datetime(bars['date']).dt.tz_localize(None).dt.normalize()
+    bars = bars.reindex(columns=['date', 'symbol', *BAR_COLUMNS]).rename_axis(columns=None)
+    return bars.dropna(subset=['close'])
+
+
+def history_start(end):
+    """Earliest date `period_returns` needs for returns ending at `end`, with slack for holidays."""
+    return min(datetime.date(end.year - 1, 12, 15), end - datetime.timedelta(days=45))
+
+
+class PriceStore:
+    """Daily bars for any number of symbols, fetched once and topped up incrementally."""
+
+    def __init__(self, root=None, path=None, download=yf_download, batch_size=None):
+        self.root = root or config.PRICES_DIR
+        self.path = path or config.STORE_PATH
+        self.batch_size = batch_size or config.PRICES_BATCH
+        self._download = download
+        init_schema(self.path, _SCHEMA)
+        self._bars = None  # every stored bar, deduplicated, loaded on first use
+        self._lock = threading.Lock()
+        self.downloads = 0  # bulk download calls made by this store
+
+    def _parts(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(os.path.join(self.root, name) for name in os.listdir(self.root) if name.endswith('.parquet'))
+
+    def _all_bars(self):
+        if self._bars is None:
+            parts = self._parts()
+            if parts:
+                import pyarrow.parquet as pq
+                bars = pq.read_table(parts).to_pandas()
+                bars['symbol'] = bars['symbol'].astype(str)
+                # Later parts win, so a re-fetched bar replaces the earlier one
+                self._bars = bars.drop_duplicates(['symbol', 'date'], keep='last').reset_index(drop=True)
+            else:
+                self._bars = _empty_bars()
+        return self._bars
+
+    def _append(self, bars):
+        """Persist newly downloaded bars as one Parquet part and merge them into memory."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        os.makedirs(self.root, exist_ok=True)
+        table = pa.Table.from_pandas(bars.reset_index(drop=True), preserve_index=False)
+        table = table.set_column(table.schema.get_field_index('symbol'), 'symbol',
+                                 table.column('symbol').cast(pa.string()).dictionary_encode())
+        path = os.path.join(self.root, f"{time.time_ns()}.parquet")
+        pq.write_table(table, path + '.tmp', compression='zstd')
+        os.replace(path + '.tmp', path)
+        merged = pd.concat([self._all_bars(), bars], ignore_index=True)
+        self._bars = merged.drop_duplicates(['symbol', 'date'], keep='last').reset_index(drop=True)
+
+    def coverage(self, symbols):
+        """{ symbol : (start, end) } of the date range already fetched."""
+        symbols = list(symbols)
+        covered = {}
+        conn = connect(self.path)
+        try:
+            for i in range(0, len(symbols), 500):
+                chunk = symbols[i:i + 500]
+                query = f"SELECT symbol, start, end FROM price_coverage WHERE symbol IN ({','.join('?' * len(chunk))})"
+                for symbol, start, end in conn.execute(query, chunk):
+                    covered[symbol] = (datetime.date.fromisoformat(start), datetime.date.fromisoformat(end))
+        finally:
+            conn.close()
+        return covered
+
+    def _set_coverage(self, ranges):
+        conn = connect(self.path)
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO price_coverage VALUES (?, ?, ?, ?) ON CONFLICT (symbol) DO UPDATE SET "
+                    "start = excluded.start, end = excluded.end, refreshed_at = excluded.refreshed_at",
+                    [(s, start.isoformat(), end.isoformat(), time.time()) for s, (start, end) in ranges.items()])
+        finally:
+            conn.close()
+
+    def missing(self, symbols, start, end):
+        """{ (start, end) : [symbols] } still to download, so symbols needing the same dates share a call."""
+        covered = self.coverage(symbols)
+        ranges = {}
+        for symbol in symbols:
+            if symbol not in covered:
+                ranges.setdefault((start, end), []).append(symbol)
+                continue
+            have_start, have_end = covered[symbol]
+            if start < have_start:
+                ranges.setdefault((start, have_start - _DAY), []).append(symbol)
+            if end > have_end:
+                ranges.setdefault((have_end + _DAY, end), []).append(symbol)
+        return ranges
+
+    def load(self, symbols, start, end):
+        """Long frame of bars for `symbols` over [start, end], downloading only what is not stored yet."""
+        symbols = list(dict.fromkeys(symbols))
+        with self._lock:
+            covered = self.coverage(symbols)
+            for (range_start, range_end), group in self.missing(symbols, start, end).items():
+                for i in range(0, len(group), self.batch_size):
+                    batch = group[i:i + self.batch_size]
+                    try:
+                        with span('prices.download'):
+                            bars = self._download(batch, range_start, range_end)
+                    except Exception as e:
+                        log.warning("Downloading %d symbols for %s..%s failed: %s", len(batch), range_start, range_end, e)
+                        continue
+                    self.downloads += 1
+                    if not bars.empty:
+                        self._append(bars)
+                    # A symbol with no bars is retried next time: yf.download reports throttling and failures
+                    # as an empty frame, so nothing is covered from one unless the range has no weekdays at all
+                    if not bars.empty:
+                        returned = set(bars['symbol'])
+                    else:
+                        returned = set(batch) if not len(pd.bdate_range(range_start, range_end)) else set()
+                    updated = {}
+                    for symbol in batch:
+                        if symbol in returned:
+                            have_start, have_end = covered.get(symbol, (range_start, range_end))
+                            updated[symbol] = (min(have_start, range_start), max(have_end, range_end))
+                    covered.update(updated)
+                    self._set_coverage(updated)
+            bars = self._all_bars()
+        mask = (bars['symbol'].isin(symbols) & (bars['date'] >= pd.Timestamp(start))
+                & (bars['date'] <= pd.Timestamp(end)))
+        return bars[mask].sort_values(['symbol', 'date'], kind='stable').reset_index(drop=True)
+
+    def closes(self, symbols, start, end, column='adj_close'):
+        """Dates x symbols matrix of closing prices (adjusted by default)."""
+        bars = self.load(symbols, start, end)
+        wide = bars.pivot(index='date', columns='symbol', values=column)
+        return wide.reindex(columns=list(dict.fromkeys(symbols)))
+
+
+def period_returns(closes, periods=tuple(PERIODS)):
+    """
+    Percent return per symbol for each period, ending at the last row of `closes`.
+
+    `closes` is a dates x symbols matrix; each period's base is the last close on
+    or before its start date, looked up for every symbol at once.
+    """
+    closes = closes.sort_index().ffill()
+    if closes.empty:
+        return pd.DataFrame(index=closes.columns, columns=list(periods), dtype='float64')
+    end = closes.index[-1]
+    last = closes.iloc[-1].to_numpy(dtype='float64')
+    returns = {}
+    for period in periods:
+        offset = PERIODS[period]
+        base_date = end - offset if offset is not None else pd.Timestamp(end.year - 1, 12, 31)
+        i = closes.index.searchsorted(base_date, side='right') - 1
+        base = closes.iloc[i].to_numpy(dtype='float64') if i >= 0 else np.full(len(last), np.nan)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            returns[period] = (last / base - 1) * 100
+    return pd.DataFrame(returns, index=closes.columns)
+
+
+_price_store = None
+_price_store_lock = threading.Lock()
+
+
+def get_price_store():
+    """Process-wide PriceStore at config.PRICES_DIR."""
+    global _price_store
+    with _price_store_lock:
+        if _price_store is None:
+            _price_store = PriceStore()
+        return _price_store
+
+
+def get_returns(symbols, latest=None, end=None, store=None):
+    """
+    1W/1M/YTD returns in percent, indexed by yf_symbol.
+
+    History runs through `end` (yesterday by default, the last complete session).
+    `latest` optionally maps yf_symbol -> current price; it is appended as today's
+    close so returns include the live move.
+    """
+    store = store or get_price_store()
+    end = end or datetime.date.today() - _DAY
+    closes = store.closes(symbols, history_start(end), end)
+    if latest is not None:
+        today = pd.Timestamp(end + _DAY)
+        closes.loc[today] = pd.Series(latest, dtype='float64').reindex(closes.columns)
+    return period_returns(closes)
@@ -0,0 +1,64 @@
+"""Incremental sector resolution on top of the fundamentals store.
+
+The shipped `sector_map.csv` is only a read-only seed: its rows are imported into
+the store once per process. After that, resolving a set of symbols diffs them
+against what the store already knows, fetches only the missing or expired ones
+concurrently, and merges them back in a single transaction.
+"""
+import os
+import threading
+
+import pandas as pd
+
+import config
+from metrics import timed
+from store import get_fundamentals, get_store
+
+UNKNOWN_SECTOR = "Unknown"
+
+_seeded = set()
+_seed_lock = threading.Lock()
+
+
+def seed_from_csv(store, path=None):
+    """Import sectors from the seed CSV for symbols the store has never seen."""
+    path = path or config.SECTOR_SEED_PATH
+    with _seed_lock:
+        if (store.path, path) in _seeded or not os.path.exists(path):
+            return
+        seed = pd.read_csv(path, index_col=0)['sector'].dropna().to_dict()
+        known = store.read(seed, ('sector',))
+        fresh = {symbol: {'sector': sector} for symbol, sector in seed.items() if symbol not in known}
+        # Stamp with the file's age so seeded rows expire like fetched ones
+        store.write(fresh, fetched_at=os.path.getmtime(path))
+        _seeded.add((store.path, path))
+
+
+@timed('sectors.resolve')
+def resolve_sectors(symbols, store=None, on_progress=None):
+    """{ yf_symbol : sector } for every requested symbol, "Unknown" where Yahoo has none."""
+    store = store or get_store()
+    seed_from_csv(store)
+    fundamentals = get_fundamentals(symbols, ('sector',), store=store, on_progress=on_progress)
+    return {symbol: (fundamentals.data.get(symbol) or {}).get('sector') or UNKNOWN_SECTOR
+            for symbol in dict.fromkeys(symbols)}
+
+
+def known_sectors(symbols, store=None):
+    """{ yf_symbol : sector } from the store and seed only, whatever their age; never touches the network."""
+    store = store or get_store()
+    seed_from_csv(store)
+    rows = store.read(list(dict.fromkeys(symbols)), ('sector',))
+    return {symbol: row['sector'][0] for symbol, row in rows.items() if row['sector'][0]}
+
+
+def attach_sectors(frame, store=None):
+    """Copy of an index frame with a 'sector' column."""
+    sector_map = resolve_sectors(frame['yf_symbol'].tolist(), store=store)
+    return frame.assign(sector=frame['yf_symbol'].map(sector_map).fillna(UNKNOWN_SECTOR))
+
+
+def attach_known_sectors(frame, store=None):
+    """Like `attach_sectors`, but from what is already stored, so it returns at once on a cold store."""
+    sector_map = known_sectors(frame['yf_symbol'].tolist(), store=store)
+    return frame.assign(sector=frame['yf_symbol'].map(sector_map).fillna(UNKNOWN_SECTOR))
@@ -0,0 +1,159 @@
+"""Persistent on-disk fundamentals store shared across sessions, restarts and processes.
+
+One SQLite row per (symbol, field) with its own fetch timestamp, so each field
+ages out on its own TTL. The database runs in WAL mode: any number of server
+processes can read while one writes, and writers wait on `busy_timeout` rather
+than failing.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+import config
+from metrics import cache_hit, cache_miss
+from fundamentals import FundamentalsResult, fetch_fundamentals
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fundamentals (
+    symbol     TEXT NOT NULL,
+    field      TEXT NOT NULL,
+    value,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (symbol, field)
+) WITHOUT ROWID
+"""
+
+
+def connect(path):
+    """New connection to the SQLite file at `path`; one per call keeps callers safe from any thread."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA busy_timeout=30000")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def init_schema(path, schema):
+    conn = connect(path)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(schema)
+    finally:
+        conn.close()
+
+
+def field_ttl(field_name):
+    return config.FIELD_TTLS.get(field_name, config.VALUATION_TTL)
+
+
+class FundamentalsStore:
+    """Symbol-keyed store of fundamentals fields with per-field fetch timestamps."""
+
+    def __init__(self, path=None):
+        self.path = path or config.STORE_PATH
+        init_schema(self.path, _SCHEMA)
+
+    def read(self, symbols, fields):
+        """{ symbol : { field : (value, fetched_at) } } for the stored subset of symbols x fields."""
+        symbols = list(symbols)
+        rows = {}
+        conn = connect(self.path)
+        try:
+            # Stay well below SQLite's bound-parameter limit
+            for i in range(0, len(symbols), 500):
+                chunk = symbols[i:i + 500]
+                query = (f"SELECT symbol, field, value, fetched_at FROM fundamentals "
+                         f"WHERE symbol IN ({','.join('?' * len(chunk))}) "
+                         f"AND field IN ({','.join('?' * len(fields))})")
+                for symbol, field_name, value, fetched_at in conn.execute(query, [*chunk, *fields]):
+                    rows.setdefault(symbol, {})[field_name] = (value, fetched_at)
+        finally:
+            conn.close()
+        return rows
+
+    def write(self, data, fetched_at=None):
+        """Upsert { symbol : { field : value } } in a single transaction."""
+        fetched_at = fetched_at or time.time()
+        params = [(symbol, field_name, value, fetched_at)
+                  for symbol, row in data.items() for field_name, value in row.items()]
+        if not params:
+            return
+        conn = connect(self.path)
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO fundamentals (symbol, field, value, fetched_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (symbol, field) DO UPDATE SET value = excluded.value, fetched_at = excluded.fetched_at",
+                    params)
+        finally:
+            conn.close()
+
+    def stale(self, rows, symbols, fields, now=None):
+        """{ symbol : [fields] } that are missing from `rows` or older than their TTL."""
+        now = now or time.time()
+        stale = {}
+        for symbol in symbols:
+            known = rows.get(symbol, {})
+            missing = [f for f in fields if f not in known or now - known[f][1] > field_ttl(f)]
+            if missing:
+                stale[symbol] = missing
+        return stale
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Process-wide FundamentalsStore at config.STORE_PATH."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = FundamentalsStore()
+        return _store
+
+
+def get_fundamentals(symbols, fields, store=None, on_progress=None):
+    """
+    Fundamentals for `symbols`, served from the store and refreshed incrementally.
+
+    Only symbols with a missing or expired field go to the network, and only for
+    those fields. If a refresh fails, the previous value is kept and served; a
+    symbol is reported in `errors` only when nothing at all is known for it.
+    """
+    store = store or get_store()
+    symbols = list(dict.fromkeys(symbols))
+    fields = tuple(fields)
+    rows = store.read(symbols, fields)
+    stale = store.stale(rows, symbols, fields)
+    cache_hit('fundamentals_store', len(symbols) - len(stale))
+    cache_miss('fundamentals_store', len(stale))
+
+    # Group by the exact set of stale fields so each symbol asks for no more than it needs
+    batches = {}
+    for symbol, stale_fields in stale.items():
+        batches.setdefault(tuple(stale_fields), []).append(symbol)
+
+    result = FundamentalsResult()
+    start = time.time()
+    done_before = 0
+    for batch_fields, batch_symbols in batches.items():
+        progress = None
+        if on_progress:
+            progress = lambda done, _total, offset=done_before: on_progress(offset + done, len(stale))
+        fetched = fetch_fundamentals(batch_symbols, fields=batch_fields, on_progress=progress)
+        store.write(fetched.data)
+        for symbol, row in fetched.data.items():
+            for field_name, value in row.items():
+                rows.setdefault(symbol, {})[field_name] = (value, start)
+        result.errors.update({s: e for s, e in fetched.errors.items() if s not in rows})
+        done_before += len(batch_symbols)
+
+    for symbol in symbols:
+        if symbol in rows:
+            result.data[symbol] = {f: rows[symbol][f][0] for f in fields if f in rows[symbol]}
+    result.elapsed = time.time() - start
+    return result
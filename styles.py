@@ -0,0 +1,100 @@
+"""Page styling for the dashboard, injected once per run after `st.set_page_config`."""
+import streamlit as st
+
+# ---------------------- CUSTOM CSS FOR ULTIMATE BEAUTY ----------------------
+APP_CSS = """
+    <style>
+    /* Global styles - Elegant, modern theme with gradients and shadows */
+    .stApp {
+        background: linear-gradient(to bottom right, #e6f0ff, #f0f4f8);
+        color: #1e1e1e;
+        font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+    }
+    /* Button styling - Vibrant, hover effects */
+    .stButton > button {
+        background: linear-gradient(135deg, #4CAF50, #45a049);
+        color: white;
+        border: none;
+        border-radius: 8px;
+        padding: 0.6rem 1.2rem;
+        box-shadow: 0 4px 6px rgba(0,0,0,0.1);
+        transition: all 0.3s ease;
+    }
+    .stButton > button:hover {
+        background: linear-gradient(135deg, #45a049, #4CAF50);
+        box-shadow: 0 6px 8px rgba(0,0,0,0.15);
+        transform: translateY(-2px);
+    }
+    /* Selectbox and multiselect - Clean, with subtle borders */
+    .stSelectbox > div, .stMultiselect > div {
+        background-color: #ffffff;
+        border: 1px solid #d1d1d1;
+        border-radius: 8px;
+        box-shadow: 0 2px 4px rgba(0,0,0,0.05);
+    }
+    /* Header - Bold, centered with shadow */
+    h1 {
+        color: #007BFF;
+        text-align: center;
+        text-shadow: 1px 1px 2px rgba(0,0,0,0.1);
+    }
+    /* Caption - Elegant footer */
+    .stCaption {
+        text-align: center;
+        color: #666666;
+        font-style: italic;
+    }
+    /* Treemap - Enhanced hover and borders */
+    .modebar {
+        background-color: rgba(255,255,255,0.9) !important;
+        border-radius: 8px;
+        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+    }
+    /* Pie chart - Smooth animations */
+    .js-plotly-plot .plotly .modebar {
+        left: 50%;
+        transform: translateX(-50%);
+    }
+    /* Expander - Card-like with subtle gradient */
+    .stExpander {
+        background: linear-gradient(to bottom, #ffffff, #f9f9f9);
+        border: 1px solid #e0e0e0;
+        border-radius: 12px;
+        box-shadow: 0 4px 8px rgba(0,0,0,0.05);
+        transition: all 0.3s ease;
+    }
+    .stExpander:hover {
+        box-shadow: 0 6px 12px rgba(0,0,0,0.1);
+    }
+    /* Spinner - Custom color */
+    .stSpinner {
+        color: #007BFF;
+    }
+    /* Divider - Stylish */
+    hr {
+        border: 0;
+        height: 1px;
+        background: linear-gradient(to right, transparent, #d1d1d1, transparent);
+    }
+    /* Add subtle animations for inputs */
+    input, select {
+        transition: border-color 0.3s ease;
+    }
+    input:focus, select:focus {
+        border-color: #007BFF !important;
+    }
+    /* Market details styling */
+    .market-details {
+        background: #f9f9f9;
+        border: 1px solid #e0e0e0;
+        border-radius: 8px;
+        padding: 1rem;
+        margin-top: 1rem;
+        box-shadow: 0 2px 4px rgba(0,0,0,0.05);
+    }
+    </style>
+    """
+
+
+def inject_css():
+    st.markdown(APP_CSS, unsafe_allow_html=True)
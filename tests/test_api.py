@@ -0,0 +1,47 @@
+import datetime
+import threading
+import urllib.request
+
+import pandas as pd
+import pytest
+
+import api
+from circuit import get_breaker
+from poller import Snapshot
+
+
+class OnePoller:
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+
+    def get(self, index_name):
+        return self.snapshot
+
+
+@pytest.fixture
+def insights_url(monkeypatch):
+    frame = pd.DataFrame({'symbol': ['A'], 'yf_symbol': ['A.NS'], 'lastPrice': [1.0], 'pChange': [1.0]})
+    builds = []
+    monkeypatch.setattr(api, 'body_cache', api.BodyCache())
+    monkeypatch.setitem(api.RENDERERS, 'insights', ('application/json', lambda s: builds.append(1) or b'{}'))
+    server = api.make_server('127.0.0.1', 0, OnePoller(Snapshot.build('NIFTY 50', frame, datetime.datetime.now())))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/snapshot/NIFTY%2050/insights", builds
+    server.shutdown()
+    get_breaker('yahoo').success()
+
+
+def test_insights_are_not_cached_while_yahoo_circuit_is_open(insights_url):
+    url, builds = insights_url
+    breaker = get_breaker('yahoo')
+    for _ in range(breaker.max_failures):
+        breaker.failure('503')
+    for _ in range(2):
+        response = urllib.request.urlopen(url)
+        assert response.headers['ETag'] is None
+        assert response.headers['Cache-Control'] == 'no-store'
+    assert len(builds) == 2
+
+    breaker.success()
+    tags = {urllib.request.urlopen(url).headers['ETag'] for _ in range(2)}
+    assert len(builds) == 3 and None not in tags and len(tags) == 1
@@ -0,0 +1,106 @@
+import threading
+import time
+
+import pytest
+
+from benchmarks.stubs import YahooStub
+from circuit import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from fundamentals import FetchError, YahooClient
+
+COOLDOWN = 0.05
+
+
+def opened(failures=3):
+    breaker = CircuitBreaker('test', failures=failures, cooldown=COOLDOWN)
+    for _ in range(failures):
+        breaker.failure('503')
+    return breaker
+
+
+def test_opens_after_max_failures_in_a_row():
+    breaker = CircuitBreaker('test', failures=3, cooldown=60)
+    breaker.failure('503')
+    breaker.failure('503')
+    breaker.success()  # resets the run of failures
+    breaker.failure('503')
+    breaker.failure('503')
+    assert breaker.state == CLOSED and breaker.allow()
+
+    breaker.failure('503')
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.stats() == {'open': 1, 'consecutive_failures': 3, 'opened': 1, 'rejected': 1}
+
+
+def test_one_probe_after_the_cooldown_while_other_callers_are_rejected():
+    breaker = opened()
+    assert not breaker.allow()
+    time.sleep(COOLDOWN * 1.5)
+
+    start = threading.Barrier(16)
+    allowed = []
+
+    def call():
+        start.wait()
+        allowed.append(breaker.allow())
+
+    threads = [threading.Thread(target=call) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert allowed.count(True) == 1
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+
+
+@pytest.mark.parametrize('probe_succeeds, state', [(True, CLOSED), (False, OPEN)])
+def test_probe_outcome_closes_or_reopens(probe_succeeds, state):
+    breaker = opened()
+    time.sleep(COOLDOWN * 1.5)
+    assert breaker.allow()  # the probe
+    if probe_succeeds:
+        breaker.success()
+    else:
+        breaker.failure('still 503')
+    assert breaker.state == state
+    assert breaker.allow() is probe_succeeds  # a failed probe starts another full cooldown
+    assert breaker.stats()['opened'] == (1 if probe_succeeds else 2)
+
+
+def test_check_raises_with_the_last_error():
+    breaker = opened()
+    with pytest.raises(Exception, match='circuit open.*503'):
+        breaker.check()
+
+
+class FlakyYahoo(YahooStub):
+    """404 for UNKNOWN* symbols, 503 for DOWN* symbols, the usual payload otherwise."""
+
+    def route(self, method, path, query, body):
+        symbol = path.rsplit('/', 1)[1]
+        if symbol.startswith('UNKNOWN'):
+            return 404, {}, b''
+        if symbol.startswith('DOWN'):
+            return 503, {}, b''
+        return super().route(method, path, query, body)
+
+
+def test_yahoo_404s_do_not_count_as_failures():
+    with FlakyYahoo() as stub:
+        client = YahooClient(base_url=stub.url, cookie_url=stub.url, timeout=5)
+        client._breaker = breaker = CircuitBreaker('yahoo', failures=3, cooldown=60)
+        for i in range(5):
+            with pytest.raises(FetchError) as error:
+                client.quote_summary(f"UNKNOWN{i}.NS")
+            assert not error.value.retryable
+        assert breaker.closed and breaker.stats()['consecutive_failures'] == 0
+
+        for i in range(3):
+            with pytest.raises(FetchError):
+                client.quote_summary(f"DOWN{i}.NS")
+        assert breaker.state == OPEN
+        requests = stub.requests
+        with pytest.raises(FetchError, match='circuit open'):
+            client.quote_summary('INFY.NS')
+        assert stub.requests == requests  # rejected without a request
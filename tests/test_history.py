@@ -0,0 +1,80 @@
+import datetime
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from history import HistoryStore
+from market_data import compact_frame
+
+DAY = datetime.date(2024, 5, 2)
+
+
+def at(hour, minute):
+    return datetime.datetime.combine(DAY, datetime.time(hour, minute))
+
+
+def universe(prices, compact=True):
+    """Universe frame with one row per { symbol : lastPrice }."""
+    frame = pd.DataFrame({
+        'symbol': list(prices),
+        'lastPrice': list(prices.values()),
+        'change': 1.0,
+        'pChange': 0.5,
+        'ffmc': 100.0,
+        'totalTradedVolume': 1000.0,
+        'sector': 'Banks',
+    })
+    frame['yf_symbol'] = frame['symbol'] + '.NS'
+    return compact_frame(frame) if compact else frame
+
+
+@pytest.mark.parametrize('compact', [True, False])
+def test_append_survives_universe_membership_changes(tmp_path, compact):
+    store = HistoryStore(str(tmp_path))
+    polls = [{'A': 1.0, 'B': 2.0, 'C': 3.0}, {'A': 1.0, 'B': 2.0}, {'A': 1.0, 'B': 2.0}, {'A': 1.0, 'B': 2.0, 'C': 3.0}]
+    written = [store.append(universe(prices, compact), at(9, 15 + i)) for i, prices in enumerate(polls)]
+    assert written == [3, 1, 0, 1]
+
+    history = store.load(DAY)
+    assert sorted(history.frame_at(at(9, 16))['symbol']) == ['A', 'B']
+    assert sorted(history.frame_at(at(9, 18))['symbol']) == ['A', 'B', 'C']
+
+
+def test_frame_at_rebuilds_every_poll_with_tombstones_and_returning_symbols(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    polls = [
+        {'A': 10.0, 'B': 20.0, 'C': 30.0},
+        {'A': 11.0, 'B': 20.0, 'C': 30.0},  # only A changes
+        {'A': 11.0, 'B': 20.0},  # C leaves: a tombstone
+        {'A': 11.0, 'B': 21.0, 'C': 33.0},  # C comes back with a new price
+    ]
+    written = [store.append(universe(prices), at(10, i)) for i, prices in enumerate(polls)]
+    assert written == [3, 1, 1, 2]
+
+    history = HistoryStore(str(tmp_path)).load(DAY)  # read back from disk only
+    assert history.times == [at(10, i) for i in range(len(polls))]
+    assert history.frame_at(at(9, 59)).empty
+    for i, prices in enumerate(polls):
+        for when in (at(10, i), at(10, i) + datetime.timedelta(seconds=30)):
+            frame = history.frame_at(when).set_index('symbol')
+            assert frame['lastPrice'].to_dict() == prices
+            assert set(frame['sector']) == {'Banks'}
+            assert list(frame['yf_symbol']) == [f"{s}.NS" for s in frame.index]
+
+
+def test_append_after_restart_diffs_against_disk(tmp_path):
+    HistoryStore(str(tmp_path)).append(universe({'A': 1.0, 'B': 2.0}), at(11, 0))
+    restarted = HistoryStore(str(tmp_path))
+    assert restarted.append(universe({'A': 1.0, 'B': 2.0}), at(11, 1)) == 0
+    assert restarted.append(universe({'A': 1.5, 'B': 2.0}), at(11, 2)) == 1
+    assert restarted.times(DAY) == [at(11, 0), at(11, 2)]
+
+
+def test_new_day_starts_a_full_part(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    store.append(universe({'A': 1.0, 'B': 2.0}), at(15, 29))
+    next_day = datetime.datetime.combine(DAY + datetime.timedelta(days=1), datetime.time(9, 15))
+    assert store.append(universe({'A': 1.0, 'B': 2.0}), next_day) == 2
+    assert store.days() == [next_day.date(), DAY]
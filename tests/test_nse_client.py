@@ -0,0 +1,20 @@
+import time
+
+from benchmarks.stubs import NSEStub
+from nse_client import NSEClient
+
+
+def test_cookies_are_reused_until_they_expire():
+    with NSEStub({'NIFTY 50': ['A', 'B']}, cookie_max_age=7200) as stub:
+        client = NSEClient(base_url=stub.url, cookie_ttl=240)
+        client.equity_stock_indices('NIFTY 50')
+        assert client._expires_at - time.time() > 7000
+        client._expires_at -= 300  # 300 s later, past cookie_ttl but well within the cookie's own expiry
+        client.equity_stock_indices('NIFTY 50')
+        assert stub.warmups == 1
+
+
+def test_cookie_ttl_applies_when_cookies_carry_no_expiry():
+    client = NSEClient(base_url='http://127.0.0.1:9', cookie_ttl=240)
+    client._session.cookies.set('nsit', 'session-only')
+    assert client._cookie_expiry(1000.0) == 1240.0
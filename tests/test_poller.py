@@ -0,0 +1,36 @@
+import sqlite3
+
+import pandas as pd
+
+from membership import UNIVERSE, MembershipIndex
+from poller import MarketPoller
+
+
+def fetch(index_name):
+    return pd.DataFrame({'symbol': ['A', 'B'], 'yf_symbol': ['A.NS', 'B.NS'], 'lastPrice': [1.0, 2.0],
+                         'pChange': [0.5, -0.5]})
+
+
+class LockedMembership(MembershipIndex):
+    def update(self, index_name, symbols):
+        raise sqlite3.OperationalError("database is locked")
+
+
+def test_poll_survives_locked_stores(tmp_path):
+    calls = []
+
+    def decorate(frame):
+        calls.append(1)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return frame.assign(sector='Banks')
+
+    poller = MarketPoller(indices=[UNIVERSE, 'NIFTY 50'], fetch=fetch, decorate=decorate,
+                          membership=LockedMembership(str(tmp_path / 'market.db')))
+    poller.poll_once()
+    assert poller._universe is None
+    assert 'locked' in poller.last_error(UNIVERSE)
+
+    poller.poll_once()  # the store is still locked for membership writes; quotes come through anyway
+    assert list(poller._universe.frame['symbol']) == ['A', 'B']
+    assert poller.last_error(UNIVERSE) is None
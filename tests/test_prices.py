@@ -0,0 +1,119 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from prices import BAR_COLUMNS, PriceStore, get_returns, period_returns
+
+START, END = datetime.date(2025, 1, 1), datetime.date(2025, 1, 31)
+
+
+class Downloader:
+    """Bars on every weekday, close = 100 + day of month; `missing` symbols never come back."""
+
+    def __init__(self, missing=()):
+        self.missing = set(missing)
+        self.calls = []
+
+    def __call__(self, symbols, start, end):
+        self.calls.append((sorted(symbols), start, end))
+        rows = [{'date': date, 'symbol': symbol, **{column: 100.0 + date.day for column in BAR_COLUMNS}}
+                for symbol in symbols if symbol not in self.missing
+                for date in pd.bdate_range(start, end)]
+        return pd.DataFrame(rows, columns=['date', 'symbol', *BAR_COLUMNS])
+
+
+@pytest.fixture
+def store(tmp_path):
+    return PriceStore(root=str(tmp_path / 'prices'), path=str(tmp_path / 'market.db'), download=Downloader())
+
+
+def test_cold_load_downloads_once_and_records_coverage(store):
+    bars = store.load(['A.NS', 'B.NS'], START, END)
+    assert store._download.calls == [(['A.NS', 'B.NS'], START, END)]
+    assert len(bars) == 2 * len(pd.bdate_range(START, END))
+    assert store.coverage(['A.NS', 'B.NS', 'C.NS']) == {'A.NS': (START, END), 'B.NS': (START, END)}
+
+    store.load(['A.NS', 'B.NS'], START, END)
+    assert len(store._download.calls) == 1
+
+
+def test_missing_groups_symbols_by_the_range_they_still_need(store):
+    store.load(['A.NS'], START, END)
+    later = datetime.date(2025, 2, 7)
+    earlier = datetime.date(2024, 12, 20)
+    assert store.missing(['A.NS', 'B.NS'], START, later) == {
+        (datetime.date(2025, 2, 1), later): ['A.NS'],
+        (START, later): ['B.NS'],
+    }
+    assert store.missing(['A.NS'], earlier, later) == {
+        (earlier, datetime.date(2024, 12, 31)): ['A.NS'],
+        (datetime.date(2025, 2, 1), later): ['A.NS'],
+    }
+
+
+def test_top_up_downloads_only_new_sessions_and_survives_a_restart(store, tmp_path):
+    store.load(['A.NS', 'B.NS'], START, END)
+    later = datetime.date(2025, 2, 7)
+    bars = store.load(['A.NS', 'B.NS'], START, later)
+    assert store._download.calls[1:] == [(['A.NS', 'B.NS'], datetime.date(2025, 2, 1), later)]
+    assert bars.groupby('symbol')['date'].max().tolist() == [pd.Timestamp(later)] * 2
+
+    reopened = PriceStore(root=store.root, path=store.path, download=Downloader())
+    again = reopened.load(['A.NS', 'B.NS'], START, later)
+    assert reopened._download.calls == []
+    pd.testing.assert_frame_equal(again, bars)
+
+
+def test_symbols_without_bars_stay_uncovered_and_are_retried(tmp_path):
+    download = Downloader(missing={'GONE.NS'})
+    store = PriceStore(root=str(tmp_path / 'prices'), path=str(tmp_path / 'market.db'), download=download)
+    store.load(['A.NS', 'GONE.NS'], START, END)
+    assert set(store.coverage(['A.NS', 'GONE.NS'])) == {'A.NS'}
+    store.load(['A.NS', 'GONE.NS'], START, END)
+    assert download.calls[1:] == [(['GONE.NS'], START, END)]
+
+
+def test_an_empty_download_covers_nothing(tmp_path):
+    failing = Downloader(missing={'A.NS', 'B.NS'})  # what yf.download returns when Yahoo throttles
+    store = PriceStore(root=str(tmp_path / 'prices'), path=str(tmp_path / 'market.db'), download=failing)
+    assert store.load(['A.NS', 'B.NS'], START, END).empty
+    assert store.coverage(['A.NS', 'B.NS']) == {}
+
+    store._download = working = Downloader()
+    assert len(store.load(['A.NS', 'B.NS'], START, END)) == 2 * len(pd.bdate_range(START, END))
+    assert working.calls == [(['A.NS', 'B.NS'], START, END)]
+
+
+def test_an_empty_weekend_range_is_covered(store):
+    saturday, sunday = datetime.date(2025, 2, 1), datetime.date(2025, 2, 2)
+    store.load(['A.NS'], START, END)
+    store.load(['A.NS'], START, sunday)
+    assert store.coverage(['A.NS']) == {'A.NS': (START, sunday)}
+    assert store._download.calls[1:] == [(['A.NS'], saturday, sunday)]
+
+
+def test_period_returns_against_hand_computed_values():
+    dates = pd.to_datetime(['2024-12-30', '2024-12-31', '2025-01-27', '2025-01-31', '2025-02-20', '2025-02-28'])
+    closes = pd.DataFrame({
+        'X': [90, 100, 110, 120, 125, 150],
+        'Y': [50, np.nan, 40, np.nan, 80, np.nan],  # gaps carry the previous close forward
+        'Z': [np.nan, np.nan, np.nan, np.nan, 10, 12],  # listed after the 1M and YTD bases
+    }, index=dates, dtype='float64')
+    returns = period_returns(closes)
+    # 1W base: last close on or before 21 Feb (20 Feb); 1M: 28 Jan (27 Jan); YTD: 31 Dec
+    expected = pd.DataFrame({'1W': [150 / 125 - 1, 0.0, 12 / 10 - 1],
+                             '1M': [150 / 110 - 1, 80 / 40 - 1, np.nan],
+                             'YTD': [150 / 100 - 1, 80 / 50 - 1, np.nan]}, index=['X', 'Y', 'Z']) * 100
+    pd.testing.assert_frame_equal(returns, expected)
+
+
+def test_get_returns_appends_the_live_price(store):
+    returns = get_returns(['A.NS'], latest={'A.NS': 262.0}, end=END, store=store)
+    # The live price is the close of 1 Feb: 1W is measured from 24 Jan (124), YTD from 31 Dec (131)
+    assert returns.loc['A.NS', '1W'] == pytest.approx((262 / 124 - 1) * 100)
+    assert returns.loc['A.NS', 'YTD'] == pytest.approx(100.0)
+    assert store._download.calls == [(['A.NS'], datetime.date(2024, 12, 15), END)]
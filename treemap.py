@@ -0,0 +1,193 @@
+"""Lightweight treemap rendering for large indices.
+
+`build_treemap_figure` builds a `go.Treemap` straight from id/parent/value
+arrays instead of going through `px.treemap`, which infers the hierarchy with a
+pandas groupby per level and attaches per-node styling. Numeric arrays are
+float32, so Plotly ships them as compact base64 typed arrays. Past
+`max_leaves`, the smallest constituents of each sector collapse into one
+"Others" node. `build_sector_figure` is the rollup view: one tile per sector,
+with constituents only rendered once the user drills into a sector. Built
+figures are cached per snapshot and slice mode in `figure_cache`.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+import config
+from metrics import cache_hit, cache_miss, timed
+
+HOVER_TEMPLATE = (
+    '<b>%{label}</b><br>'
+    'Sector: %{parent}<br>'
+    'Size: %{value}<br>'
+    'Market Cap: %{customdata[1]:,.0f} Cr<br>'
+    '%{meta}: %{customdata[0]:.2f}%'
+    '<extra></extra>'
+)
+SECTOR_HOVER_TEMPLATE = (
+    '<b>%{label}</b><br>'
+    'Stocks: %{customdata[2]:,.0f} (▲ %{customdata[3]:,.0f} / ▼ %{customdata[4]:,.0f})<br>'
+    'Market Cap: %{customdata[1]:,.0f} Cr<br>'
+    '%{meta} (cap-weighted): %{customdata[0]:.2f}%'
+    '<extra></extra>'
+)
+
+
+def _weighted(values, weights, codes, k):
+    """Per-group weighted mean of the finite `values` via bincount; NaN where a group has no weight."""
+    ok = np.isfinite(values)
+    total = np.bincount(codes, weights=np.where(ok, weights, 0.0), minlength=k)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.bincount(codes, weights=np.where(ok, values * weights, 0.0), minlength=k) / total
+
+
+def treemap_arrays(df, slice_factor, max_leaves=None, color_by='pChange'):
+    """
+    ids, labels, parents, values, colour and ffmc arrays for a sector -> symbol treemap.
+
+    Sector nodes carry the sum of their children (branchvalues='total') and the
+    size-weighted `color_by` of their children, as px.treemap would colour them.
+    """
+    df = df[df[slice_factor] > 0]
+    sector = df['sector'].astype(str).to_numpy() if 'sector' in df.columns else np.full(len(df), 'Unknown')
+    symbol = df['symbol'].astype(str).to_numpy()
+    value = df[slice_factor].to_numpy(dtype='float64')
+    pchange = df[color_by].to_numpy(dtype='float64')
+    ffmc = df['ffmc'].to_numpy(dtype='float64')
+
+    # Collapse everything below the `max_leaves` largest leaves into one node per sector
+    keep = np.ones(len(df), dtype=bool)
+    if max_leaves and len(df) > max_leaves:
+        keep[:] = False
+        keep[np.argsort(-value, kind='stable')[:max_leaves]] = True
+
+    codes, sectors = pd.factorize(sector)
+    k = len(sectors)
+    leaf_ids = [f"{s}/{sym}" for s, sym in zip(sector[keep], symbol[keep])]
+    ids = list(sectors) + leaf_ids
+    labels = list(sectors) + list(symbol[keep])
+    parents = [""] * k + list(sector[keep])
+    values = [np.bincount(codes, weights=value, minlength=k), value[keep]]
+    colors = [_weighted(pchange, value, codes, k), pchange[keep]]
+    caps = [np.bincount(codes, weights=ffmc, minlength=k), ffmc[keep]]
+
+    if not keep.all():
+        rest = ~keep
+        rest_codes = codes[rest]
+        counts = np.bincount(rest_codes, minlength=k)
+        others = np.flatnonzero(counts)
+        ids += [f"{sectors[c]}/Others" for c in others]
+        labels += [f"Others ({counts[c]})" for c in others]
+        parents += [sectors[c] for c in others]
+        values.append(np.bincount(rest_codes, weights=value[rest], minlength=k)[others])
+        colors.append(_weighted(pchange[rest], value[rest], rest_codes, k)[others])
+        caps.append(np.bincount(rest_codes, weights=ffmc[rest], minlength=k)[others])
+
+    return (ids, labels, parents, np.concatenate(values).astype('float32'),
+            np.concatenate(colors).astype('float32'), np.concatenate(caps).astype('float32'))
+
+
+@timed('render.treemap')
+def build_treemap_figure(df, slice_factor, color_scale, height=900, max_leaves=None, color_by='pChange'):
+    """Reusable treemap for both single and multi index modes; tiles are coloured by the `color_by` column"""
+    ids, labels, parents, values, colors, caps = treemap_arrays(df, slice_factor, max_leaves, color_by)
+    fig = go.Figure(go.Treemap(
+        ids=ids,
+        labels=labels,
+        parents=parents,
+        values=values,
+        branchvalues='total',
+        customdata=np.column_stack([colors, caps]),
+        marker=dict(colors=colors, colorscale=color_scale, showscale=False,
+                    cornerradius=8, line=dict(width=2, color='#ffffff')),
+        hovertemplate=HOVER_TEMPLATE,
+        meta=color_by,
+        texttemplate='%{label}<br>%{customdata[0]:.2f}%',
+        textposition='middle center',
+    ))
+    fig.update_layout(
+        margin=dict(t=30, l=0, r=0, b=0),
+        height=height,
+        paper_bgcolor="rgba(0, 0, 0, 0)",
+        plot_bgcolor="rgba(0, 0, 0, 0)",
+    )
+    return fig
+
+
+@timed('render.sector_treemap')
+def build_sector_figure(sectors, color_scale, height=900, color_label='pChange'):
+    """
+    Sector-only treemap from a MarketAggregates.sectors frame: one tile per sector,
+    sized by ffmc and coloured by cap-weighted return; no constituents are sent.
+    """
+    sectors = sectors[sectors['cap'] > 0]
+    colors = sectors['cap_weighted_return'].to_numpy(dtype='float32')
+    customdata = np.column_stack([colors, sectors[['cap', 'stocks', 'advances', 'declines']].to_numpy(dtype='float32')])
+    fig = go.Figure(go.Treemap(
+        labels=list(sectors.index),
+        parents=[""] * len(sectors),
+        values=sectors['cap'].to_numpy(dtype='float32'),
+        customdata=customdata,
+        marker=dict(colors=colors, colorscale=color_scale, showscale=False,
+                    cornerradius=8, line=dict(width=2, color='#ffffff')),
+        hovertemplate=SECTOR_HOVER_TEMPLATE,
+        meta=color_label,
+        texttemplate='%{label}<br>%{customdata[0]:.2f}%',
+        textposition='middle center',
+    ))
+    fig.update_layout(
+        margin=dict(t=30, l=0, r=0, b=0),
+        height=height,
+        paper_bgcolor="rgba(0, 0, 0, 0)",
+        plot_bgcolor="rgba(0, 0, 0, 0)",
+    )
+    return fig
+
+
+class FigureCache:
+    """Thread-safe LRU of built figures, shared by every session; figures are never mutated after caching."""
+
+    def __init__(self, max_entries=64, name='figures'):
+        self.max_entries = max_entries
+        self.name = name
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, build):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                cache_hit(self.name)
+                return self._entries[key]
+        cache_miss(self.name)
+        fig = build()
+        with self._lock:
+            self._entries[key] = fig
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return fig
+
+
+figure_cache = FigureCache()
+
+
+def cached_treemap(key, df, slice_factor, color_scale, height=900, max_leaves=None, color_by='pChange'):
+    """
+    Treemap for `df`, built once per `key`.
+
+    `key` must identify the snapshot and everything that changes the figure's
+    content (index, snapshot time, slice mode, search filter, colour column, height).
+    """
+    max_leaves = config.TREEMAP_MAX_LEAVES if max_leaves is None else max_leaves
+    return figure_cache.get_or_build(
+        (key, max_leaves),
+        lambda: build_treemap_figure(df, slice_factor, color_scale, height, max_leaves, color_by))
+
+
+def cached_sector_treemap(key, sectors, color_scale, height=900, color_label='pChange'):
+    """Sector rollup figure for `sectors`, built once per `key` (same rules as `cached_treemap`)."""
+    return figure_cache.get_or_build(
+        ('sectors', key), lambda: build_sector_figure(sectors, color_scale, height, color_label))
@@ -0,0 +1,86 @@
+"""Precomputed, read-only views over one snapshot for the slice, sort and search widgets.
+
+A `SnapshotView` is built once per snapshot and shared by every session. It
+holds the presorted orderings, gainer/loser masks and a substring index over
+the symbols, so a widget change is a few NumPy index operations instead of a
+fresh filter/sort pipeline over the whole frame.
+"""
+import numpy as np
+import pandas as pd
+from plotly.colors import diverging
+
+from metrics import span, timed
+
+SLICE_MODES = {
+    # slice_by : (slice_factor, color_scale)
+    'Market Cap': ('ffmc', diverging.RdYlGn),
+    'Gainers': ('pChange', ['white', '#a5eb79']),
+    'Losers': ('Abs', ['#ff7a3a', 'white']),
+}
+SORT_OPTIONS = {
+    # sort_by : (column, descending)
+    "pChange (High to Low)": ('pChange', True),
+    "pChange (Low to High)": ('pChange', False),
+    "ffmc (High to Low)": ('ffmc', True),
+    "ffmc (Low to High)": ('ffmc', False),
+}
+# Copy-on-write is always on from pandas 3, so a shallow copy can be handed out without exposing the snapshot
+_SHARE_BUFFERS = int(pd.__version__.split('.')[0]) >= 3
+
+
+class SnapshotView:
+    def __init__(self, frame):
+        with span('transform.view_build'):
+            self._build(frame)
+
+    def _build(self, frame):
+        self.frame = frame.reset_index(drop=True)
+        n = len(self.frame)
+        pchange = self.frame['pChange'].to_numpy(dtype='float64', na_value=np.nan)
+        self.abs_change = np.abs(pchange)
+
+        self.masks = {
+            'Market Cap': np.ones(n, dtype=bool),
+            'Gainers': pchange > 0,
+            'Losers': pchange < 0,
+        }
+
+        # Stable orderings; NaN goes last in both directions, as with sort_values
+        self.orders = {None: np.arange(n)}
+        for sort_by, (column, descending) in SORT_OPTIONS.items():
+            values = self.frame[column].to_numpy(dtype='float64', na_value=np.nan)
+            self.orders[sort_by] = np.argsort(-values if descending else values, kind='stable')
+
+        # Every substring of every symbol -> row positions, for O(1) search
+        index = {}
+        for position, symbol in enumerate(self.frame['symbol'].astype(str).str.upper()):
+            substrings = {symbol[i:j] for i in range(len(symbol)) for j in range(i + 1, len(symbol) + 1)}
+            for substring in substrings:
+                index.setdefault(substring, []).append(position)
+        self._search = {substring: np.array(rows) for substring, rows in index.items()}
+
+    def search(self, query):
+        """Row positions whose symbol contains `query` (case-insensitive)."""
+        return self._search.get(query.strip().upper(), np.array([], dtype=int))
+
+    @timed('transform.view_select')
+    def select(self, slice_by='Market Cap', sort_by=None, search=''):
+        """(df, slice_factor, color_scale) for one combination of widget values; df is a new frame object."""
+        keep = self.masks[slice_by]
+        if search.strip():
+            hits = np.zeros(len(keep), dtype=bool)
+            hits[self.search(search)] = True
+            keep = keep & hits
+        order = self.orders[sort_by]
+        rows = order[keep[order]]
+
+        # The whole frame in its own order is the default view: share the snapshot's buffers instead of
+        # copying every column per rerun
+        if _SHARE_BUFFERS and sort_by is None and len(rows) == len(keep):
+            df = self.frame.copy(deep=False)
+        else:
+            df = self.frame.take(rows)
+        if slice_by == 'Losers':
+            df = df.assign(Abs=self.abs_change[rows])
+        slice_factor, color_scale = SLICE_MODES[slice_by]
+        return df, slice_factor, color_scale